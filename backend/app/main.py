@@ -20,7 +20,9 @@ app.add_middleware(
 @app.on_event("startup")
 def startup_event():
     from app.utils.firebase_client import initialize_firebase
-    from app.services.recommendation_engine import warm_trending_cache
+    from app.services.recommendation_engine import warm_trending_cache, warm_venue_store
+    from app.services.event_writer import get_event_writer
+    from app.services.freeze_engine import get_freeze_engine
 
     try:
         initialize_firebase()
@@ -30,6 +32,23 @@ def startup_event():
         raise
 
     warm_trending_cache()
+    warm_venue_store()
+    get_event_writer()
+    get_freeze_engine()
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    from app.services.event_writer import stop_event_writer
+    from app.services.event_log import close_event_log
+    from app.services.freeze_engine import stop_freeze_engine
+    from app.utils.blocking import shutdown_blocking_executor
+
+    # Drain buffered analytics events before the process exits
+    stop_event_writer()
+    stop_freeze_engine()
+    close_event_log()
+    shutdown_blocking_executor()
 
 
 @app.get("/health")
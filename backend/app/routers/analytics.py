@@ -1,107 +1,224 @@
+import asyncio
+import time
+import zlib
 from datetime import datetime, timezone
+from typing import Optional
 from uuid import uuid4
-from fastapi import APIRouter, HTTPException
-from app.utils.firebase_client import get_db
+from fastapi import APIRouter, HTTPException, Request
+from config import settings
 from app.models.event import EventBatchRequest
+from app.utils.blocking import run_blocking
+from app.utils.firebase_client import get_db
+from app.services.event_dedup import create_event_deduplicator
+from app.services.event_writer import FIRESTORE_MAX_BATCH_WRITES, firestore_encoding_error, get_event_writer
+from app.services.event_log import get_event_log
+from app.services.freeze_engine import get_freeze_engine
+from app.services.event_parser import (
+    MAX_BATCH_EVENTS,
+    EventValidationError,
+    parse_event_batch,
+    parse_ndjson_events,
+)
 import logging
 
 router = APIRouter(prefix="/api/analytics", tags=["analytics"])
 logger = logging.getLogger(__name__)
 
-# In-memory deduplication cache
-_recent_event_ids: dict[str, int] = {}  # event_id -> timestamp_ms
+# Event ids seen in the last ANALYTICS_DEDUP_WINDOW_SECONDS (per host when
+# ANALYTICS_DEDUP_PATH is set, otherwise per process)
+_deduplicator = create_event_deduplicator()
+
+# Bulk uploads: longest accepted line (also the gzip inflate step), how long
+# to wait for room in a full queue, and how many invalid lines to report
+_MAX_LINE_BYTES = 1024 * 1024
+_STREAM_RESERVE_TIMEOUT_SECONDS = 30
+_MAX_REPORTED_ERRORS = 20
+
+def _inline_schema_refs(schema: dict) -> dict:
+    """Resolve local $defs references so the schema stands alone inside an operation."""
+    definitions = schema.pop("$defs", {})
+
+    def resolve(node):
+        if isinstance(node, dict):
+            if "$ref" in node:
+                return resolve(definitions[node["$ref"].rsplit("/", 1)[-1]])
+            return {key: resolve(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [resolve(value) for value in node]
+        return node
+
+    return resolve(schema)
+
+# /event decodes the body itself (see event_parser), so its request schema is
+# declared here for the OpenAPI docs rather than derived from a parameter
+_EVENT_BATCH_REQUEST_BODY = {
+    "required": True,
+    "content": {"application/json": {"schema": _inline_schema_refs(EventBatchRequest.model_json_schema())}},
+}
 
 def _now_ms() -> int:
     return int(datetime.now(tz=timezone.utc).timestamp() * 1000)
 
+def _ack_status() -> str:
+    """'queued' when events are written behind the response, 'logged' once they are in Firestore."""
+    return "queued" if get_event_writer() is not None else "logged"
+
 def _generate_session_id() -> str:
     return f"session_{_now_ms()}_{uuid4().hex[:12]}"
 
-def _is_duplicate(event_id: str) -> bool:
-    """Check if event_id was seen in last 60 seconds."""
-    now = _now_ms()
-    
-    # Clean old entries (older than 60 seconds)
-    expired_ids = [
-        eid for eid, ts in _recent_event_ids.items()
-        if now - ts > 60000
-    ]
-    for eid in expired_ids:
-        del _recent_event_ids[eid]
-    
-    # Check if current event is duplicate
-    if event_id in _recent_event_ids:
-        return True
-    
-    # Mark as seen
-    _recent_event_ids[event_id] = now
-    return False
-
-
-@router.post("/event")
-async def log_analytics_events(request: EventBatchRequest):
+def _commit_events(payloads: list[dict]) -> None:
+    """Synchronous path used when ANALYTICS_WRITE_BEHIND is off."""
+    db = get_db()
+    for start in range(0, len(payloads), FIRESTORE_MAX_BATCH_WRITES):
+        write_batch = db.batch()
+        for payload in payloads[start:start + FIRESTORE_MAX_BATCH_WRITES]:
+            write_batch.set(db.collection("behavioral_events").document(), payload)
+        write_batch.commit()
+
+
+async def _reserve(writer, count: int, timeout: float = 0) -> None:
+    """Claim write-behind capacity, waiting up to timeout seconds for the queue to drain."""
+    deadline = time.monotonic() + timeout
+    while not writer.reserve(count):
+        if time.monotonic() >= deadline:
+            raise HTTPException(
+                status_code=503,
+                detail="Analytics queue is full, retry later",
+                headers={"Retry-After": "5"},
+            )
+        await asyncio.sleep(writer.flush_interval / 4)
+
+
+def _check_storable(events: list[dict]) -> None:
+    """Reject the request if any event cannot be stored as a Firestore document."""
+    errors = []
+    for i, event in enumerate(events):
+        problem = firestore_encoding_error(event)
+        if problem:
+            errors.append(EventValidationError(("events", i), problem).to_detail())
+    if errors:
+        raise HTTPException(status_code=400, detail=errors)
+
+
+async def _ingest_events(events: list[dict], batch_session_id: str, reserve_timeout: float = 0,
+                         checked: bool = False) -> tuple[int, int]:
+    """Deduplicate, normalize and persist validated event dicts. Returns (logged, duplicates).
+
+    Events are checked to be storable before anything else (unless the
+    caller already did), so a rejected event never reaches the dedup window
+    or a shared write batch.
+    """
+    if not checked:
+        _check_storable(events)
+
+    writer = get_event_writer()
+    reserved = 0
+    if writer is not None:
+        await _reserve(writer, len(events), reserve_timeout)
+        reserved = len(events)
+
+    try:
+        payloads = []
+        duplicate_count = 0
+
+        # One dedup lookup for the whole batch, in event order
+        event_ids = [event["event_id"] for event in events if event.get("event_id")]
+        duplicate_flags = []
+        if event_ids:
+            duplicate_flags = await run_blocking(_deduplicator.check_batch, event_ids, _now_ms())
+        duplicate_flags = iter(duplicate_flags)
+
+        for payload in events:
+            # Check for duplicate using event_id
+            if payload.get("event_id") and next(duplicate_flags):
+                duplicate_count += 1
+                continue
+
+            # Normalize fields on the decoded dict itself, which is stored as-is
+            if not payload.get("session_id"):
+                payload["session_id"] = batch_session_id
+
+            if payload.get("timestamp") is None:
+                payload["timestamp"] = _now_ms()
+
+            payloads.append(payload)
+
+        # Server-side freeze rules; detections are counted and logged by the engine
+        freeze_engine = get_freeze_engine()
+        if freeze_engine is not None and payloads:
+            try:
+                await run_blocking(freeze_engine.process, payloads, _now_ms())
+            except Exception as e:
+                logger.error(f"Freeze detection failed for {len(payloads)} events: {e}")
+
+        # Local copy for training exports; Firestore stays the source of truth
+        event_log = get_event_log()
+        if event_log is not None and payloads:
+            try:
+                await run_blocking(event_log.append, payloads)
+            except Exception as e:
+                logger.error(f"Failed to append {len(payloads)} events to local event log: {e}")
+
+        if writer is not None:
+            writer.submit(payloads, reserved=reserved)
+            reserved = 0
+        else:
+            await run_blocking(_commit_events, payloads)
+
+        return len(payloads), duplicate_count
+    finally:
+        if reserved:
+            writer.submit([], reserved=reserved)
+
+
+@router.post("/event", openapi_extra={"requestBody": _EVENT_BATCH_REQUEST_BODY})
+async def log_analytics_events(request: Request):
     """
     Save a batch of behavioral events to Firestore.
-    
+
     - Target collection: behavioral_events
+    - Body: EventBatchRequest (1-500 events). Only event_type, session_id,
+      timestamp, event_id and user_id are validated; other fields are stored as sent
     - Ensures each event has session_id and timestamp
-    - Deduplicates events within 60-second window
+    - Rejects the batch with 400 if it is malformed or an event cannot be
+      stored in Firestore
+    - Deduplicates event_ids within ANALYTICS_DEDUP_WINDOW_SECONDS (60 s)
+    - With ANALYTICS_WRITE_BEHIND, events are queued and acknowledged
+      immediately with status "queued"; a full queue answers 503 with Retry-After
+    - With ANALYTICS_EVENT_LOG_DIR, events are also appended to a local log
+    - With FREEZE_ENGINE_ENABLED, events feed server-side freeze detection
     """
     try:
-        db = get_db()
+        events, batch_session_id = parse_event_batch(await request.body())
+    except EventValidationError as e:
+        raise HTTPException(status_code=400, detail=[e.to_detail()])
 
+    try:
         # Resolve batch-level session_id
-        batch_session_id = request.session_id
         if not batch_session_id:
-            for event in request.events:
-                if event.session_id:
-                    batch_session_id = str(event.session_id)
+            for event in events:
+                if event.get("session_id"):
+                    batch_session_id = event["session_id"]
                     break
 
         if not batch_session_id:
             batch_session_id = _generate_session_id()
 
-        logger.info(f"Logging {len(request.events)} events for session {batch_session_id}")
+        logger.info(f"Logging {len(events)} events for session {batch_session_id}")
 
-        # Process events
-        write_batch = db.batch()
-        logged_count = 0
-        duplicate_count = 0
-        
-        for event in request.events:
-            # Check for duplicate using event_id
-            if event.event_id and _is_duplicate(str(event.event_id)):
-                duplicate_count += 1
-                continue
-            
-            # Convert Pydantic model to dict for Firestore
-            payload = event.model_dump(exclude_none=True)
-            
-            # Normalize fields
-            payload["event_type"] = str(event.event_type)
-            payload["session_id"] = str(event.session_id or batch_session_id)
-            
-            if "timestamp" not in payload or payload["timestamp"] is None:
-                payload["timestamp"] = _now_ms()
-            
-            # Write to Firestore
-            event_ref = db.collection("behavioral_events").document()
-            write_batch.set(event_ref, payload)
-            logged_count += 1
+        logged_count, duplicate_count = await _ingest_events(events, batch_session_id)
 
-        write_batch.commit()
-        
         logger.info(f"Successfully logged {logged_count} events ({duplicate_count} duplicates skipped)")
-        
+
         response = {
-            "status": "logged",
+            "status": _ack_status(),
             "count": logged_count,
             "session_id": batch_session_id,
         }
-        
+
         if duplicate_count > 0:
             response["duplicates_skipped"] = duplicate_count
-        
+
         return response
 
     except HTTPException:
@@ -109,3 +226,132 @@ async def log_analytics_events(request: EventBatchRequest):
     except Exception as e:
         logger.error(f"Failed to log events: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to log events: {e}")
+
+
+async def _request_lines(request: Request, max_bytes: int):
+    """Yield the lines of a (possibly gzip-encoded) request body as it arrives."""
+    encoding = request.headers.get("content-encoding", "").lower()
+    if encoding not in ("", "identity", "gzip"):
+        raise HTTPException(status_code=415, detail=f"Unsupported Content-Encoding: {encoding}")
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS) if encoding == "gzip" else None
+
+    pending = b""
+    total = 0
+
+    def split(data: bytes) -> list[bytes]:
+        nonlocal pending, total
+        total += len(data)
+        if total > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Upload exceeds {settings.ANALYTICS_STREAM_MAX_MB} MB")
+        *lines, pending = (pending + data).split(b"\n")
+        if len(pending) > _MAX_LINE_BYTES:
+            raise HTTPException(status_code=413, detail="Event line too long")
+        return lines
+
+    try:
+        async for chunk in request.stream():
+            if inflater is None:
+                for line in split(chunk):
+                    yield line
+                continue
+            # Inflate in bounded steps so a small body cannot expand all at once
+            data = inflater.decompress(chunk, _MAX_LINE_BYTES)
+            while True:
+                for line in split(data):
+                    yield line
+                if not inflater.unconsumed_tail:
+                    break
+                data = inflater.decompress(inflater.unconsumed_tail, _MAX_LINE_BYTES)
+        if inflater is not None and not inflater.eof:
+            raise HTTPException(status_code=400, detail="Truncated gzip body")
+    except zlib.error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid gzip body: {e}")
+    if pending:
+        yield pending
+
+
+@router.post("/events/stream")
+async def stream_analytics_events(request: Request, session_id: Optional[str] = None):
+    """
+    Bulk upload of behavioral events as NDJSON (one event object per line),
+    optionally sent with Content-Encoding: gzip. Meant for large offline uploads.
+
+    - Lines are parsed and stored 500 at a time while the body streams in
+    - Invalid lines are skipped and reported; the rest of the upload is kept
+    - session_id (query) fills events without one; otherwise one is generated
+    - A full write-behind queue is waited on rather than answered with 503
+    - Events stored before a failure stay stored: send event_ids so a retried
+      upload is deduplicated
+    """
+    batch_session_id = session_id or _generate_session_id()
+    max_bytes = settings.ANALYTICS_STREAM_MAX_MB * 1024 * 1024
+    logged_count = 0
+    duplicate_count = 0
+    errors: list[EventValidationError] = []
+    lines: list[bytes] = []
+    next_line = 1
+
+    async def flush() -> None:
+        nonlocal lines, next_line, logged_count, duplicate_count
+        events, line_errors = await run_blocking(parse_ndjson_events, lines, next_line, firestore_encoding_error)
+        next_line += len(lines)
+        lines = []
+        errors.extend(line_errors)
+        if events:
+            logged, duplicates = await _ingest_events(
+                events, batch_session_id, _STREAM_RESERVE_TIMEOUT_SECONDS, checked=True,
+            )
+            logged_count += logged
+            duplicate_count += duplicates
+
+    try:
+        async for line in _request_lines(request, max_bytes):
+            lines.append(line)
+            if len(lines) >= MAX_BATCH_EVENTS:
+                await flush()
+        if lines:
+            await flush()
+    except HTTPException as e:
+        if logged_count:
+            e.detail = f"{e.detail} ({logged_count} events stored before the failure)"
+        raise
+    except Exception as e:
+        logger.error(f"Failed to stream events: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to log events: {e} ({logged_count} events stored before the failure)",
+        )
+
+    logger.info(
+        f"Streamed {logged_count} events for session {batch_session_id} "
+        f"({duplicate_count} duplicates skipped, {len(errors)} invalid lines)"
+    )
+
+    response = {
+        "status": _ack_status(),
+        "count": logged_count,
+        "session_id": batch_session_id,
+    }
+    if duplicate_count > 0:
+        response["duplicates_skipped"] = duplicate_count
+    if errors:
+        response["invalid_lines"] = len(errors)
+        response["errors"] = [e.to_detail() for e in errors[:_MAX_REPORTED_ERRORS]]
+    return response
+
+
+@router.get("/freeze")
+async def get_freeze_detections(session_id: Optional[str] = None, limit: int = 50):
+    """
+    Server-side freeze detection summary for threshold tuning.
+
+    - Counts of detections per rule and level since the process started
+    - Most recent detections first, optionally for one session
+    """
+    freeze_engine = get_freeze_engine()
+    if freeze_engine is None:
+        raise HTTPException(status_code=404, detail="Freeze engine is disabled")
+    return {
+        **freeze_engine.stats(),
+        "recent": freeze_engine.recent_detections(session_id=session_id, limit=min(max(limit, 1), 1000)),
+    }
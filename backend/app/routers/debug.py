@@ -3,6 +3,7 @@ from __future__ import annotations
 import os
 from fastapi import APIRouter, HTTPException
 
+from app.utils.blocking import run_blocking
 from app.utils.firebase_client import get_db
 
 router = APIRouter(prefix="/api/dev", tags=["debug"])
@@ -27,9 +28,9 @@ async def firestore_smoke_test():
     try:
         db = get_db()
         ref = db.collection("dev_smoke_tests").document("firebase_client")
-        ref.set({"ok": True, "source": "api_smoke_test"}, merge=True)
+        await run_blocking(ref.set, {"ok": True, "source": "api_smoke_test"}, merge=True)
 
-        snap = ref.get()
+        snap = await run_blocking(ref.get)
         if not snap.exists:
             raise HTTPException(
                 status_code=500,
@@ -2,6 +2,7 @@ import threading
 from fastapi import APIRouter, HTTPException
 from app.models.venue import RecommendationRequest
 from app.services.recommendation_engine import get_recommendations, get_trending_venues, refresh_trending_cache
+from app.utils.blocking import run_blocking
 
 router = APIRouter(prefix="/api/recommendations", tags=["recommendations"])
 
@@ -9,7 +10,8 @@ router = APIRouter(prefix="/api/recommendations", tags=["recommendations"])
 @router.post("")
 async def get_venue_recommendations(request: RecommendationRequest):
     try:
-        recommendations = get_recommendations(
+        recommendations = await run_blocking(
+            get_recommendations,
             user_id=request.user_id,
             user_lat=request.location.latitude,
             user_lon=request.location.longitude,
@@ -36,7 +38,7 @@ async def get_venue_recommendations(request: RecommendationRequest):
 @router.get("/trending")
 async def get_trending():
     try:
-        venues = get_trending_venues(limit=10)
+        venues = await run_blocking(get_trending_venues, limit=10)
         return {
             "venues": venues,
             "count": len(venues)
@@ -5,7 +5,9 @@ from typing import List, Optional
 from app.models.user import OnboardingRequest, OnboardingResponse, UserPreferences
 from app.services.user_service import onboard_user
 from app.services.embedding_service import generate_user_embedding
-from app.utils.firebase_client import get_db, get_user
+from app.services.recommendation_engine import invalidate_user_recommendations
+from app.utils.blocking import run_blocking
+from app.utils.firebase_client import get_db, get_user, invalidate_user
 from openai import OpenAIError
 
 router = APIRouter(prefix="/api/user", tags=["user"])
@@ -21,7 +23,7 @@ class UpdatePreferencesRequest(BaseModel):
 @router.post("/onboard", response_model=OnboardingResponse)
 async def onboard_user_endpoint(request: OnboardingRequest):
     try:
-        result = onboard_user(request.username, request.preferences)
+        result = await run_blocking(onboard_user, request.username, request.preferences)
         return result
     
     except ValueError as ve:
@@ -45,7 +47,7 @@ async def onboard_user_endpoint(request: OnboardingRequest):
 @router.get("/{user_id}")
 async def get_user_profile(user_id: str):
     try:
-        user = get_user(user_id)
+        user = await run_blocking(get_user, user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -69,7 +71,7 @@ async def get_user_profile(user_id: str):
 @router.patch("/{user_id}/preferences")
 async def update_user_preferences(user_id: str, request: UpdatePreferencesRequest):
     try:
-        user = get_user(user_id)
+        user = await run_blocking(get_user, user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -87,13 +89,16 @@ async def update_user_preferences(user_id: str, request: UpdatePreferencesReques
         if request.excluded_categories is not None:
             updated_prefs["excluded_categories"] = request.excluded_categories
         
-        new_embedding = generate_user_embedding(updated_prefs)
+        new_embedding = await run_blocking(generate_user_embedding, updated_prefs)
         
-        db.collection("users").document(user_id).update({
+        changes = {
             "preferences": updated_prefs,
             "embedding": new_embedding,
             "updated_at": datetime.utcnow().isoformat()
-        })
+        }
+        await run_blocking(db.collection("users").document(user_id).update, changes)
+        invalidate_user(user_id)
+        invalidate_user_recommendations(user_id)
         
         return {
             "status": "success",
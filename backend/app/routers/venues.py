@@ -2,7 +2,9 @@ from datetime import datetime
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from google.cloud import firestore
-from app.utils.firebase_client import get_db, get_user
+from app.utils.embedding_codec import without_embeddings
+from app.utils.blocking import run_blocking
+from app.utils.firebase_client import get_db, get_user, invalidate_user
 
 router = APIRouter(prefix="/api/venues", tags=["venues"])
 
@@ -17,14 +19,16 @@ async def save_venue(request: SaveVenueRequest):
     try:
         db = get_db()
         
-        user = get_user(request.user_id)
+        user = await run_blocking(get_user, request.user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        db.collection("users").document(request.user_id).update({
+        saved_at = datetime.utcnow().isoformat()
+        await run_blocking(db.collection("users").document(request.user_id).update, {
             "saved_venues": firestore.ArrayUnion([request.venue_id]),
-            f"saved_venues_at.{request.venue_id}": datetime.utcnow().isoformat(),
+            f"saved_venues_at.{request.venue_id}": saved_at,
         })
+        invalidate_user(request.user_id)
         
         return {"status": "success", "message": "Venue saved"}
     
@@ -42,14 +46,15 @@ async def unsave_venue(request: SaveVenueRequest):
     try:
         db = get_db()
         
-        user = get_user(request.user_id)
+        user = await run_blocking(get_user, request.user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        db.collection("users").document(request.user_id).update({
+        await run_blocking(db.collection("users").document(request.user_id).update, {
             "saved_venues": firestore.ArrayRemove([request.venue_id]),
             f"saved_venues_at.{request.venue_id}": firestore.DELETE_FIELD,
         })
+        invalidate_user(request.user_id)
         
         return {"status": "success", "message": "Venue unsaved"}
     
@@ -65,7 +70,7 @@ async def unsave_venue(request: SaveVenueRequest):
 @router.get("/saved/{user_id}")
 async def get_saved_venues(user_id: str):
     try:
-        user = get_user(user_id)
+        user = await run_blocking(get_user, user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -79,9 +84,10 @@ async def get_saved_venues(user_id: str):
         venues = []
 
         refs = [db.collection("venues").document(venue_id) for venue_id in saved_ids]
-        for doc in db.get_all(refs):
+        docs = await run_blocking(lambda: list(db.get_all(refs)))
+        for doc in docs:
             if doc.exists:
-                venue_data = doc.to_dict()
+                venue_data = without_embeddings(doc.to_dict())
                 venue_data["venue_id"] = doc.id
                 venue_data["saved_at"] = saved_at_map.get(doc.id)
                 venues.append(venue_data)
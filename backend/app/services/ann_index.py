@@ -0,0 +1,79 @@
+import copy
+import numpy as np
+from typing import Optional
+
+# Rows sampled per list when training centroids; assignment still covers every row
+_TRAIN_SAMPLES_PER_LIST = 64
+
+
+class IVFIndex:
+    """Inverted-file ANN index over L2-normalized embeddings.
+
+    Rows are clustered with spherical k-means into n_lists inverted lists.
+    A query scores only the centroids, then keeps the rows whose list is
+    among the n_probe closest. n_probe is the recall/latency knob: probing
+    every list is exact, probing fewer touches roughly n_probe / n_lists of
+    the rows.
+    """
+
+    def __init__(self, embeddings: np.ndarray, n_lists: Optional[int] = None, n_iter: int = 10, seed: int = 0):
+        n = len(embeddings)
+        if n == 0:
+            raise ValueError("Cannot build an ANN index over zero rows")
+        if not n_lists:
+            n_lists = int(np.sqrt(n))
+        n_lists = max(1, min(n_lists, n))
+
+        rng = np.random.default_rng(seed)
+        sample_size = min(n, n_lists * _TRAIN_SAMPLES_PER_LIST)
+        sample = embeddings[np.sort(rng.choice(n, sample_size, replace=False))]
+        centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+
+        for _ in range(n_iter):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Empty lists keep their previous centroid
+            nonempty = norms[:, 0] > 0
+            centroids[nonempty] = sums[nonempty] / norms[nonempty]
+
+        self.centroids = centroids.astype(np.float32)
+        self.assignments = self._assign(embeddings)
+
+    @classmethod
+    def from_arrays(cls, centroids: np.ndarray, assignments: np.ndarray) -> "IVFIndex":
+        index = cls.__new__(cls)
+        index.centroids = centroids
+        index.assignments = assignments
+        return index
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    def _assign(self, embeddings: np.ndarray, chunk: int = 8192) -> np.ndarray:
+        labels = np.empty(len(embeddings), dtype=np.int32)
+        for start in range(0, len(embeddings), chunk):
+            labels[start:start + chunk] = np.argmax(embeddings[start:start + chunk] @ self.centroids.T, axis=1)
+        return labels
+
+    def with_rows(self, kept_assignments: np.ndarray, new_embeddings: np.ndarray) -> "IVFIndex":
+        """Copy of the index for a store whose rows are kept rows followed by new ones.
+
+        Centroids are reused; only the new rows are assigned.
+        """
+        index = copy.copy(self)
+        index.assignments = np.concatenate([kept_assignments, self._assign(new_embeddings)])
+        return index
+
+    def probed_lists(self, query: np.ndarray, n_probe: int) -> np.ndarray:
+        """Boolean mask over lists: True for the n_probe centroids closest to query."""
+        probed = np.zeros(self.n_lists, dtype=bool)
+        n_probe = max(1, min(n_probe, self.n_lists))
+        scores = self.centroids @ np.asarray(query, dtype=np.float32)
+        if n_probe == self.n_lists:
+            probed[:] = True
+        else:
+            probed[np.argpartition(-scores, n_probe - 1)[:n_probe]] = True
+        return probed
@@ -0,0 +1,105 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+from app.utils.embedding_codec import decode_embedding, encode_embedding
+from app.utils.ttl_cache import TTLCache
+
+# Hot entries kept decoded in process memory in front of the shared store
+_MEMORY_ENTRIES = 1024
+
+# Unwritable cache directory, locked or corrupt database file, corrupt row
+_STORE_ERRORS = (sqlite3.Error, OSError, ValueError)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    text TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (model, text)
+)
+"""
+
+
+class EmbeddingCache:
+    """Bounded LRU cache of text embeddings keyed by (model, canonical text).
+
+    With a path, entries live in a SQLite file (WAL mode) that every worker on
+    the host shares and that survives restarts; the least recently used rows
+    beyond max_entries are deleted on insert. Without a path only the
+    in-process LRU is used. Store errors are logged and treated as misses,
+    so the cache can never fail an embedding request.
+    """
+
+    def __init__(self, path: str = "", max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._memory = TTLCache(min(max_entries, _MEMORY_ENTRIES), ttl_seconds=None)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if not self.path or self.max_entries <= 0:
+            return None
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        key = (model, text)
+        embedding = self._memory.get(key)
+        if embedding is not None:
+            return embedding
+
+        try:
+            with self._lock:
+                conn = self._connection()
+                if conn is None:
+                    return None
+                row = conn.execute(
+                    "SELECT vector FROM embeddings WHERE model = ? AND text = ?", key
+                ).fetchone()
+                if row is None:
+                    return None
+                embedding = decode_embedding(row[0]).tolist()
+                conn.execute(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text = ?",
+                    (time.time(), model, text),
+                )
+        except _STORE_ERRORS as e:
+            print(f"[embeddings] Cache read failed: {e}")
+            return None
+
+        self._memory.set(key, embedding)
+        return embedding
+
+    def put(self, model: str, text: str, embedding: List[float]) -> None:
+        self._memory.set((model, text), embedding)
+        try:
+            with self._lock:
+                conn = self._connection()
+                if conn is None:
+                    return
+                conn.execute(
+                    "INSERT OR REPLACE INTO embeddings (model, text, vector, last_used) VALUES (?, ?, ?, ?)",
+                    (model, text, encode_embedding(embedding), time.time()),
+                )
+                (count,) = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+                if count > self.max_entries:
+                    conn.execute(
+                        "DELETE FROM embeddings WHERE rowid IN "
+                        "(SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                        (count - self.max_entries,),
+                    )
+        except _STORE_ERRORS as e:
+            print(f"[embeddings] Cache write failed: {e}")
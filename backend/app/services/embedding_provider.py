@@ -0,0 +1,109 @@
+import hashlib
+import re
+from abc import ABC, abstractmethod
+import threading
+from typing import List, Optional
+import numpy as np
+from config import settings
+
+PROVIDERS = ("openai", "hashing")
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class EmbeddingProvider(ABC):
+    """Turns texts into embedding vectors.
+
+    `model` names the vector space; caches and precomputed tables are keyed
+    by it so vectors from different providers never mix. A backend that
+    does not implement embed() fails when it is constructed.
+    """
+
+    model: str
+    dim: int
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """One embedding per text, in input order."""
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """OpenAI embeddings API. The client is created on first use, so importing
+    this module needs neither network access nor an API key."""
+
+    def __init__(self, api_key: Optional[str], model: str = "text-embedding-3-small", dim: int = 1536,
+                 timeout: float = 10.0):
+        self.api_key = api_key
+        self.model = model
+        self.dim = dim
+        self.timeout = timeout
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    if not self.api_key:
+                        raise RuntimeError("OPENAI_API_KEY is not set (or use EMBEDDING_PROVIDER=hashing)")
+                    from openai import OpenAI
+                    self._client = OpenAI(api_key=self.api_key, timeout=self.timeout)
+        return self._client
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        response = self.client.embeddings.create(model=self.model, input=texts)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """Deterministic local embeddings from hashed words and character trigrams.
+
+    Texts sharing words or spellings get similar vectors, which is enough to
+    exercise caching, batching and the full scoring path offline. The
+    vectors carry no semantics, so rankings are not comparable to OpenAI's.
+    """
+
+    def __init__(self, dim: int = 1536):
+        self.dim = dim
+        self.model = f"hashing-ngram-{dim}"
+
+    def _features(self, text: str):
+        for word in _WORD.findall(text.lower()):
+            yield word, 1.0
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                yield padded[i:i + 3], 0.5
+
+    def embed_one(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float64)
+        for feature, weight in self._features(text):
+            digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+            sign = 1.0 if digest & 1 else -1.0
+            vector[(digest >> 1) % self.dim] += sign * weight
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_one(text) for text in texts]
+
+
+def create_embedding_provider(name: str) -> EmbeddingProvider:
+    if name == "openai":
+        return OpenAIEmbeddingProvider(settings.OPENAI_API_KEY, timeout=settings.EMBEDDING_REQUEST_TIMEOUT_SECONDS)
+    if name == "hashing":
+        return HashingEmbeddingProvider(dim=settings.EMBEDDING_HASHING_DIM)
+    raise ValueError(f"Unknown embedding provider {name!r}; expected one of {PROVIDERS}")
+
+
+_provider: Optional[EmbeddingProvider] = None
+
+
+def get_embedding_provider() -> EmbeddingProvider:
+    """Provider selected by EMBEDDING_PROVIDER, created once per process."""
+    global _provider
+    if _provider is None:
+        _provider = create_embedding_provider(settings.EMBEDDING_PROVIDER)
+    return _provider
@@ -1,13 +1,28 @@
-import hashlib
-from datetime import datetime, timedelta
-from openai import OpenAI
 from config import settings
-from typing import Dict, List, Tuple
+from typing import List
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embedding_provider import get_embedding_provider
+from app.services.embedding_vocabulary import DEFAULT_EMBEDDING_TEXT, EmbeddingVocabulary
+from app.utils.micro_batcher import MicroBatcher
+from app.utils.single_flight import SingleFlight
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+# Shared by the user and session paths; see EMBEDDING_CACHE_* settings
+_embedding_cache = EmbeddingCache(settings.EMBEDDING_CACHE_PATH, settings.EMBEDDING_CACHE_SIZE)
+# Identical texts requested concurrently share one provider call
+_embedding_flights = SingleFlight()
 
-_embedding_cache: Dict[str, Tuple[List[float], datetime]] = {}
-_EMBEDDING_TTL_HOURS = 1
+
+def _load_vocabulary():
+    vocabulary = EmbeddingVocabulary.load(settings.EMBEDDING_VOCABULARY_PATH)
+    model = get_embedding_provider().model
+    if vocabulary is not None and vocabulary.model != model:
+        print(f"[embeddings] Ignoring vocabulary built for {vocabulary.model}, expected {model}")
+        return None
+    return vocabulary
+
+
+# Precomputed preference vocabulary; None means every preference text goes to the API
+_vocabulary = _load_vocabulary()
 
 
 def create_embedding_text(dietary: List[str] = None, vibe: List[str] = None, mood: str = None) -> str:
@@ -25,46 +40,73 @@ def create_embedding_text(dietary: List[str] = None, vibe: List[str] = None, moo
     return " ".join(parts).strip()
 
 
-def generate_embedding(text: str) -> List[float]:
+def canonical_embedding_text(text: str) -> str:
+    """Whitespace-normalized text, used both as the cache key and as the API input."""
+    return " ".join(text.split())
+
+
+def generate_embeddings(texts: List[str]) -> List[List[float]]:
+    """Embed several texts with one provider request; results are in input order."""
+    unique = list(dict.fromkeys(texts))
     try:
-        response = client.embeddings.create(
-            model="text-embedding-3-small",
-            input=text
-        )
-        return response.data[0].embedding
+        embeddings = get_embedding_provider().embed(unique)
     except Exception as e:
         raise Exception(f"Failed to generate embedding: {e}")
+    by_text = dict(zip(unique, embeddings))
+    return [by_text[text] for text in texts]
 
 
-def generate_user_embedding(preferences: dict) -> List[float]:
-    dietary = preferences.get("dietary", [])
-    text = create_embedding_text(dietary=dietary)
-    
-    if not text:
-        text = "exploring Tokyo"
-    
-    return generate_embedding(text)
+# Concurrent single-text requests are sent together; see EMBEDDING_BATCH_* settings
+_embedding_batcher = MicroBatcher(
+    generate_embeddings,
+    max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+    max_wait_ms=settings.EMBEDDING_BATCH_WAIT_MS,
+    max_in_flight=settings.EMBEDDING_BATCH_MAX_IN_FLIGHT,
+    name="embedding-batcher",
+)
 
 
-def generate_session_embedding(onboarding_preferences: dict, session_preferences: dict) -> List[float]:
-    dietary = onboarding_preferences.get("dietary", [])
-    vibe = session_preferences.get("vibe", [])
-    mood = session_preferences.get("mood")
-
-    cache_key = hashlib.sha256(
-        f"{sorted(dietary)}|{sorted(vibe)}|{mood}".encode()
-    ).hexdigest()
-
-    now = datetime.utcnow()
-    if cache_key in _embedding_cache:
-        embedding, cached_at = _embedding_cache[cache_key]
-        if now - cached_at < timedelta(hours=_EMBEDDING_TTL_HOURS):
-            return embedding
+def generate_embedding(text: str) -> List[float]:
+    if settings.EMBEDDING_BATCH_MAX_SIZE <= 1:
+        return generate_embeddings([text])[0]
+    return _embedding_batcher.submit(text)
 
+
+def get_embedding(text: str) -> List[float]:
+    """Embedding of text, from the cache when possible."""
+    text = canonical_embedding_text(text)
+    model = get_embedding_provider().model
+    embedding = _embedding_cache.get(model, text)
+    if embedding is None:
+        embedding = _embedding_flights.do(text, generate_embedding, text)
+        _embedding_cache.put(model, text, embedding)
+    return embedding
+
+
+def _preference_embedding(dietary: List[str], vibe: List[str] = None, mood: str = None) -> List[float]:
+    # Sorted so the same selections in any order share one embedding
+    dietary = sorted(dietary or [])
+    vibe = sorted(vibe or [])
     text = create_embedding_text(dietary=dietary, vibe=vibe, mood=mood)
+    tokens = [token for token in dietary + vibe + [mood] if token]
     if not text:
-        text = "exploring Tokyo"
+        text = DEFAULT_EMBEDDING_TEXT
+        tokens = [DEFAULT_EMBEDDING_TEXT]
 
-    embedding = generate_embedding(text)
-    _embedding_cache[cache_key] = (embedding, now)
-    return embedding
+    if _vocabulary is not None:
+        embedding = _vocabulary.compose(tokens, canonical_embedding_text(text))
+        if embedding is not None:
+            return embedding
+    return get_embedding(text)
+
+
+def generate_user_embedding(preferences: dict) -> List[float]:
+    return _preference_embedding(preferences.get("dietary", []))
+
+
+def generate_session_embedding(onboarding_preferences: dict, session_preferences: dict) -> List[float]:
+    return _preference_embedding(
+        onboarding_preferences.get("dietary", []),
+        vibe=session_preferences.get("vibe", []),
+        mood=session_preferences.get("mood"),
+    )
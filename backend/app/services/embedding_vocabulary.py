@@ -0,0 +1,84 @@
+"""Precomputed embeddings for the closed preference vocabulary.
+
+Dietary, vibe and mood values come from fixed UI options, so their
+embeddings can be fetched once (scripts/build_embedding_vocabulary.py) and
+stored in a table. Known combinations are then embedded locally: an exact
+phrase hit when the full text was precomputed, otherwise the normalized sum
+of the token vectors. Anything containing an unknown value returns None and
+goes to the API.
+"""
+import os
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+
+# Values offered by the onboarding and home screens (frontend/lib/onboarding.tsx,
+# frontend/app/tabs/home/page.tsx); keep in sync when options change.
+DIETARY_OPTIONS = ["none", "vegetarian", "vegan", "gluten-free", "halal"]
+VIBE_OPTIONS = ["Authentic", "Lively", "Quiet"]
+MOOD_OPTIONS = ["Quick", "Relaxed", "Spontaneous"]
+
+# Embedded when a user has expressed no preferences at all
+DEFAULT_EMBEDDING_TEXT = "exploring Tokyo"
+
+
+def vocabulary_tokens() -> List[str]:
+    return DIETARY_OPTIONS + VIBE_OPTIONS + MOOD_OPTIONS + [DEFAULT_EMBEDDING_TEXT]
+
+
+def preference_token_sets(max_dietary: int = 2) -> List[List[str]]:
+    """Token lists the UI can produce: up to max_dietary dietary values plus
+    at most one vibe and one mood, in create_embedding_text order."""
+    dietary_sets = [
+        sorted(combo)
+        for size in range(max_dietary + 1)
+        for combo in combinations(DIETARY_OPTIONS, size)
+    ]
+    sets = []
+    for dietary in dietary_sets:
+        for vibe in [[]] + [[v] for v in VIBE_OPTIONS]:
+            for mood in [[]] + [[m] for m in MOOD_OPTIONS]:
+                tokens = dietary + vibe + mood
+                if tokens:
+                    sets.append(tokens)
+    return sets
+
+
+class EmbeddingVocabulary:
+    """Token and phrase embeddings for one model, loaded from an .npz table."""
+
+    def __init__(self, model: str, texts: Iterable[str], vectors: np.ndarray):
+        self.model = model
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.vectors = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+        self.rows: Dict[str, int] = {text: i for i, text in enumerate(texts)}
+
+    @classmethod
+    def load(cls, path: str) -> Optional["EmbeddingVocabulary"]:
+        if not path or not os.path.exists(path):
+            return None
+        with np.load(path) as table:
+            return cls(str(table["model"]), table["texts"].tolist(), table["vectors"])
+
+    def save(self, path: str) -> None:
+        texts = sorted(self.rows, key=self.rows.get)
+        np.savez_compressed(path, model=np.array(self.model), texts=np.array(texts), vectors=self.vectors)
+
+    def __contains__(self, text: str) -> bool:
+        return text in self.rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def compose(self, tokens: List[str], text: Optional[str] = None) -> Optional[List[float]]:
+        """Local embedding for tokens (whose joined form is text), or None if any token is unknown."""
+        if text is not None and text in self.rows:
+            return self.vectors[self.rows[text]].tolist()
+        if not tokens or any(token not in self.rows for token in tokens):
+            return None
+        summed = self.vectors[[self.rows[token] for token in tokens]].sum(axis=0)
+        norm = np.linalg.norm(summed)
+        if norm == 0:
+            return None
+        return (summed / norm).tolist()
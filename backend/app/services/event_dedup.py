@@ -0,0 +1,124 @@
+import os
+import sqlite3
+import threading
+from collections import deque
+from typing import Deque, List, Optional, Set, Tuple
+from config import settings
+
+# Expiry granularity: ids are forgotten between window and window + bucket
+_BUCKET_MS = 5000
+# Expired rows are deleted from the shared store at most this often
+_SQLITE_PURGE_INTERVAL_MS = 5000
+
+
+class EventDeduplicator:
+    """Remembers event ids for a time window in time-bucketed sets.
+
+    Each bucket holds the ids first seen during one _BUCKET_MS slice; a lookup
+    checks the live buckets (window / bucket of them) and expiry pops whole
+    buckets off the front, so insert, lookup and expiry are O(1) amortized.
+    At most max_ids ids are held: past that the oldest buckets are dropped
+    early, shortening the window under extreme load instead of growing.
+    """
+
+    def __init__(self, window_ms: int = 60000, max_ids: int = 200000, bucket_ms: int = _BUCKET_MS):
+        self.window_ms = window_ms
+        self.max_ids = max_ids
+        self.bucket_ms = bucket_ms
+        self._buckets: Deque[Tuple[int, Set[str]]] = deque()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _expire(self, now_ms: int) -> None:
+        oldest_live = (now_ms - self.window_ms) // self.bucket_ms
+        while self._buckets and (self._buckets[0][0] < oldest_live or self._size > self.max_ids):
+            _, ids = self._buckets.popleft()
+            self._size -= len(ids)
+
+    def check_batch(self, event_ids: List[str], now_ms: int) -> List[bool]:
+        """For each id, True if it was already seen within the window; unseen ids are recorded."""
+        bucket = now_ms // self.bucket_ms
+        duplicates = []
+        with self._lock:
+            self._expire(now_ms)
+            if not self._buckets or self._buckets[-1][0] != bucket:
+                self._buckets.append((bucket, set()))
+            current = self._buckets[-1][1]
+            for event_id in event_ids:
+                seen = any(event_id in ids for _, ids in self._buckets)
+                if not seen:
+                    current.add(event_id)
+                    self._size += 1
+                duplicates.append(seen)
+            self._expire(now_ms)
+        return duplicates
+
+    def is_duplicate(self, event_id: str, now_ms: int) -> bool:
+        return self.check_batch([event_id], now_ms)[0]
+
+
+class SQLiteEventDeduplicator:
+    """Event id window in a SQLite file, shared by every worker on the host.
+
+    An id counts as new if it is absent or its last sighting has expired;
+    a whole batch is checked in one transaction. Expired rows are purged
+    periodically using the seen_at index.
+    """
+
+    def __init__(self, path: str, window_ms: int = 60000):
+        self.path = path
+        self.window_ms = window_ms
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS event_ids (event_id TEXT PRIMARY KEY, seen_at INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS event_ids_seen_at ON event_ids (seen_at)")
+        self._purged_at = 0
+        self._lock = threading.Lock()
+
+    def check_batch(self, event_ids: List[str], now_ms: int) -> List[bool]:
+        expired_before = now_ms - self.window_ms
+        duplicates = []
+        with self._lock:
+            conn = self._conn
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for event_id in event_ids:
+                    cursor = conn.execute(
+                        "INSERT INTO event_ids (event_id, seen_at) VALUES (?, ?) "
+                        "ON CONFLICT (event_id) DO UPDATE SET seen_at = excluded.seen_at "
+                        "WHERE event_ids.seen_at < ?",
+                        (event_id, now_ms, expired_before),
+                    )
+                    duplicates.append(cursor.rowcount == 0)
+                if now_ms - self._purged_at >= _SQLITE_PURGE_INTERVAL_MS:
+                    conn.execute("DELETE FROM event_ids WHERE seen_at < ?", (expired_before,))
+                    self._purged_at = now_ms
+                conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                # Never drop events because the dedup store is unavailable
+                print(f"[analytics] Dedup store unavailable, accepting batch: {e}")
+                return [False] * len(event_ids)
+        return duplicates
+
+    def is_duplicate(self, event_id: str, now_ms: int) -> bool:
+        return self.check_batch([event_id], now_ms)[0]
+
+
+def create_event_deduplicator(path: Optional[str] = None):
+    """Shared SQLite deduplicator when ANALYTICS_DEDUP_PATH is set, else in-process."""
+    path = settings.ANALYTICS_DEDUP_PATH if path is None else path
+    window_ms = settings.ANALYTICS_DEDUP_WINDOW_SECONDS * 1000
+    if path:
+        return SQLiteEventDeduplicator(path, window_ms=window_ms)
+    return EventDeduplicator(window_ms=window_ms, max_ids=settings.ANALYTICS_DEDUP_MAX_IDS)
@@ -0,0 +1,313 @@
+"""Local append-only log of behavioral events and its columnar export.
+
+Each worker appends NDJSON lines to its own segment file and fsyncs at most
+every fsync_interval_ms, so durability costs one sync per interval rather
+than one per request. Segments roll over at segment_max_bytes or once they
+are segment_max_age_ms old, so quiet workers still hand data to compaction.
+The writer holds an flock on its open segment; compaction only takes over
+an open segment whose lock is free, i.e. whose writer has exited. Where
+flock is unavailable (Windows) only the staleness check guards open
+segments, so stale_seconds must then exceed the segment max age:
+
+    <ANALYTICS_EVENT_LOG_DIR>/
+        segment-20261018T120000000000-1234.ndjson.open   being written
+        segment-20261018T110000000000-1234.ndjson        closed, ready to compact
+
+compact_segments() turns closed segments into compressed column files
+partitioned by UTC day and event_type, one part per source segment:
+
+    <export_dir>/day=2026-10-18/event_type=venue_view/part-<segment>.npz
+
+Columns hold int64 for integers (0 when absent), float64 for other numbers
+and booleans (NaN when absent), and strings otherwise; nested values are
+JSON-encoded. A `_present_<name>` mask is stored for every column, so absent
+and empty values stay distinguishable.
+"""
+import glob
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+import numpy as np
+from config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: no cross-process lock
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_OPEN_SUFFIX = ".ndjson.open"
+_CLOSED_SUFFIX = ".ndjson"
+_UNSAFE_PATH_CHARS = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class EventLog:
+    """Per-process segmented append-only event log with batched fsync."""
+
+    def __init__(self, directory: str, segment_max_bytes: int = 64 * 1024 * 1024,
+                 fsync_interval_ms: int = 1000, segment_max_age_ms: int = 10 * 60 * 1000):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync_interval = fsync_interval_ms / 1000
+        self.segment_max_age = segment_max_age_ms / 1000
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._path: Optional[str] = None
+        self._opened_at = 0.0
+        self._dirty = False
+        self._closed = False
+        self._flusher = threading.Thread(target=self._flush_loop, name="event-log-fsync", daemon=True)
+        self._flusher.start()
+
+    def _open_segment(self) -> None:
+        name = f"segment-{datetime.utcnow():%Y%m%dT%H%M%S%f}-{os.getpid()}"
+        path = os.path.join(self.directory, name + _OPEN_SUFFIX)
+        file = open(path, "ab")
+        if fcntl is not None:
+            # Held until the segment is renamed; tells compaction this writer is alive
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._file = file
+        self._path = path
+        self._opened_at = time.monotonic()
+
+    def _close_segment(self) -> None:
+        """fsync and rename the current segment to its closed name. Caller holds the lock.
+
+        The rename happens while the flock is still held, so compaction never
+        sees the segment open and unlocked. If the rename fails the segment is
+        abandoned (compaction picks it up as an unlocked open segment) and the
+        next append starts a fresh one.
+        """
+        if self._file is None:
+            return
+        file, path = self._file, self._path
+        self._file = None
+        self._path = None
+        self._dirty = False
+        try:
+            file.flush()
+            os.fsync(file.fileno())
+            os.rename(path, path[:-len(_OPEN_SUFFIX)] + _CLOSED_SUFFIX)
+        except OSError as e:
+            logger.error(f"Failed to close event log segment {path}: {e}")
+        finally:
+            file.close()
+
+    def _roll_due(self) -> bool:
+        return self._file is not None and (
+            self._file.tell() >= self.segment_max_bytes
+            or time.monotonic() - self._opened_at >= self.segment_max_age
+        )
+
+    def append(self, payloads: List[Dict[str, Any]]) -> None:
+        if not payloads:
+            return
+        data = b"".join(
+            json.dumps(payload, separators=(",", ":"), default=_json_default).encode("utf-8") + b"\n"
+            for payload in payloads
+        )
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Event log is closed")
+            if self._roll_due():
+                self._close_segment()
+            if self._file is None:
+                self._open_segment()
+            self._file.write(data)
+            self._dirty = True
+            if self._roll_due():
+                self._close_segment()
+
+    def sync(self) -> None:
+        """fsync pending writes, and close the segment if it is due so idle workers still roll."""
+        with self._lock:
+            if self._roll_due():
+                self._close_segment()
+            elif self._file is not None and self._dirty:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._dirty = False
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            time.sleep(self.fsync_interval)
+            try:
+                self.sync()
+            except OSError as e:
+                logger.error(f"Event log fsync failed: {e}")
+
+    def close(self) -> None:
+        """Sync and close the current segment so it can be compacted."""
+        with self._lock:
+            self._closed = True
+            self._close_segment()
+
+
+def _partition_name(value: str) -> str:
+    return _UNSAFE_PATH_CHARS.sub("_", value) or "_"
+
+
+def _event_day(event: Dict[str, Any]) -> str:
+    timestamp = event.get("timestamp")
+    try:
+        return datetime.fromtimestamp(float(timestamp) / 1000, tz=timezone.utc).strftime("%Y-%m-%d")
+    except (TypeError, ValueError, OverflowError, OSError):
+        return "unknown"
+
+
+def _column(values: List[Any]) -> np.ndarray:
+    if all(v is None or (isinstance(v, int) and not isinstance(v, bool)) for v in values):
+        # int64 keeps millisecond timestamps and counters exact
+        try:
+            return np.array([0 if v is None else v for v in values], dtype=np.int64)
+        except OverflowError:
+            pass
+    if all(v is None or isinstance(v, (int, float)) for v in values):
+        return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+    return np.array([
+        "" if v is None else v if isinstance(v, str) else json.dumps(v, default=_json_default)
+        for v in values
+    ])
+
+
+def _columns(events: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    arrays: Dict[str, np.ndarray] = {}
+    for name in sorted({key for event in events for key in event}):
+        arrays[name] = _column([event.get(name) for event in events])
+        arrays[f"_present_{name}"] = np.array([name in event for event in events])
+    return arrays
+
+
+def compact_segment(path: str, export_dir: str) -> int:
+    """Write one closed segment's events as partitioned column files. Returns the event count.
+
+    Part files are named after the segment, so re-running after a crash
+    overwrites rather than duplicates.
+    """
+    partitions: Dict[tuple, List[Dict[str, Any]]] = defaultdict(list)
+    count = 0
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                # A torn final line from a crash mid-write
+                continue
+            partitions[(_event_day(event), str(event.get("event_type", "unknown")))].append(event)
+            count += 1
+
+    segment = os.path.basename(path).split(".", 1)[0]
+    for (day, event_type), events in partitions.items():
+        directory = os.path.join(export_dir, f"day={day}", f"event_type={_partition_name(event_type)}")
+        os.makedirs(directory, exist_ok=True)
+        target = os.path.join(directory, f"part-{segment}.npz")
+        tmp = target + ".tmp.npz"
+        np.savez_compressed(tmp, **_columns(events))
+        os.replace(tmp, target)
+    return count
+
+
+def _claim_abandoned(path: str):
+    """Lock an open segment whose writer has exited; None while a writer still holds it."""
+    try:
+        file = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    if fcntl is not None:
+        try:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            file.close()
+            return None
+    if not os.path.exists(path):
+        # Renamed to its closed name between the open and the lock
+        file.close()
+        return None
+    return file
+
+
+def compact_segments(log_dir: str, export_dir: str, stale_seconds: float = 60,
+                     keep_segments: bool = False) -> Dict[str, int]:
+    """Compact every closed segment, and open ones left behind by writers that exited.
+
+    An open segment is only taken when no writer holds its lock and it has
+    not been modified for stale_seconds. Without flock the staleness check
+    alone decides.
+    """
+    compacted = {}
+    for path in sorted(glob.glob(os.path.join(log_dir, "segment-*" + _CLOSED_SUFFIX))):
+        compacted[os.path.basename(path)] = compact_segment(path, export_dir)
+        if not keep_segments:
+            os.remove(path)
+
+    now = time.time()
+    for path in sorted(glob.glob(os.path.join(log_dir, "segment-*" + _OPEN_SUFFIX))):
+        try:
+            if now - os.path.getmtime(path) < stale_seconds:
+                continue
+        except FileNotFoundError:
+            continue
+        claimed = _claim_abandoned(path)
+        if claimed is None:
+            continue
+        with claimed:
+            compacted[os.path.basename(path)] = compact_segment(path, export_dir)
+            if not keep_segments:
+                os.remove(path)
+    return compacted
+
+
+def read_partitions(export_dir: str, day: Optional[str] = None,
+                    event_type: Optional[str] = None) -> Iterator[Dict[str, np.ndarray]]:
+    """Yield the columns of each exported part, optionally filtered by day and event_type."""
+    pattern = os.path.join(
+        export_dir,
+        f"day={day or '*'}",
+        f"event_type={_partition_name(event_type) if event_type else '*'}",
+        "part-*.npz",
+    )
+    for path in sorted(glob.glob(pattern)):
+        with np.load(path) as part:
+            yield {name: part[name] for name in part.files}
+
+
+_event_log: Optional[EventLog] = None
+_event_log_lock = threading.Lock()
+
+
+def get_event_log() -> Optional[EventLog]:
+    """This process's event log, or None when ANALYTICS_EVENT_LOG_DIR is unset."""
+    global _event_log
+    if _event_log is None and settings.ANALYTICS_EVENT_LOG_DIR:
+        with _event_log_lock:
+            if _event_log is None:
+                _event_log = EventLog(
+                    settings.ANALYTICS_EVENT_LOG_DIR,
+                    segment_max_bytes=settings.ANALYTICS_EVENT_LOG_SEGMENT_MB * 1024 * 1024,
+                    fsync_interval_ms=settings.ANALYTICS_EVENT_LOG_FSYNC_MS,
+                    segment_max_age_ms=settings.ANALYTICS_EVENT_LOG_SEGMENT_MINUTES * 60 * 1000,
+                )
+    return _event_log
+
+
+def close_event_log() -> None:
+    global _event_log
+    with _event_log_lock:
+        if _event_log is not None:
+            _event_log.close()
+            _event_log = None
@@ -0,0 +1,118 @@
+"""Lean decoding of behavioral event batches.
+
+The ingestion endpoints only rely on event_type, session_id, timestamp and
+event_id (plus user_id), so only those fields are checked, with the same
+rules the BehavioralEvent model applies. Every other field is passed through
+as decoded, without building a model and dumping it back to a dict. The
+result matches BehavioralEvent(**event).model_dump(exclude_none=True).
+"""
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+MAX_BATCH_EVENTS = 500
+_OPTIONAL_STRING_FIELDS = ("event_id", "session_id", "user_id")
+
+
+class EventValidationError(ValueError):
+    """An event or batch failed validation; loc mirrors FastAPI's error locations."""
+
+    def __init__(self, loc: Tuple[Any, ...], msg: str):
+        super().__init__(f"{'.'.join(str(part) for part in loc)}: {msg}")
+        self.loc = loc
+        self.msg = msg
+
+    def to_detail(self) -> Dict[str, Any]:
+        return {"loc": ["body", *self.loc], "msg": self.msg, "type": "value_error"}
+
+
+_TIMESTAMP_ERROR = "timestamp must be an integer (milliseconds since epoch)"
+
+
+def _coerce_timestamp(value: Any) -> Optional[int]:
+    """Lax integer parsing as in the model: ints, integral floats and numeric strings."""
+    if value is None or isinstance(value, int):
+        return None if value is None else int(value)
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            if "e" in value.lower():
+                raise ValueError(_TIMESTAMP_ERROR)
+            try:
+                value = float(value)
+            except ValueError:
+                raise ValueError(_TIMESTAMP_ERROR)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    raise ValueError(_TIMESTAMP_ERROR)
+
+
+def validate_event(event: Any, loc: Tuple[Any, ...] = ()) -> Dict[str, Any]:
+    """Check the fields ingestion relies on and return the event dict, normalized in place."""
+    if not isinstance(event, dict):
+        raise EventValidationError(loc, "event must be an object")
+    if not isinstance(event.get("event_type"), str):
+        raise EventValidationError(loc + ("event_type",), "event_type is required and must be a string")
+    for field in _OPTIONAL_STRING_FIELDS:
+        value = event.get(field)
+        if value is not None and not isinstance(value, str):
+            raise EventValidationError(loc + (field,), f"{field} must be a string")
+    if "timestamp" in event:
+        try:
+            event["timestamp"] = _coerce_timestamp(event["timestamp"])
+        except ValueError as e:
+            raise EventValidationError(loc + ("timestamp",), str(e))
+    if None in event.values():
+        # Same as model_dump(exclude_none=True): absent and null are stored alike
+        event = {key: value for key, value in event.items() if value is not None}
+    return event
+
+
+def parse_event_batch(body: bytes) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Decode an EventBatchRequest JSON body into (events, batch session_id)."""
+    try:
+        batch = json.loads(body)
+    except ValueError as e:
+        raise EventValidationError((), f"invalid JSON: {e}")
+    if not isinstance(batch, dict):
+        raise EventValidationError((), "body must be an object")
+
+    session_id = batch.get("session_id")
+    if session_id is not None and not isinstance(session_id, str):
+        raise EventValidationError(("session_id",), "session_id must be a string")
+
+    events = batch.get("events")
+    if not isinstance(events, list):
+        raise EventValidationError(("events",), "events is required and must be a list")
+    if not 1 <= len(events) <= MAX_BATCH_EVENTS:
+        raise EventValidationError(("events",), f"events must contain 1 to {MAX_BATCH_EVENTS} items")
+    return [validate_event(event, ("events", i)) for i, event in enumerate(events)], session_id
+
+
+def parse_ndjson_events(
+    lines: List[bytes],
+    first_line: int = 1,
+    check: Optional[Callable[[Dict[str, Any]], Optional[str]]] = None,
+) -> Tuple[List[Dict[str, Any]], List[EventValidationError]]:
+    """Decode one event per line, collecting invalid lines instead of failing the upload.
+
+    check, if given, returns a reason to reject an otherwise valid event.
+    """
+    events = []
+    errors = []
+    for number, line in enumerate(lines, start=first_line):
+        if not line.strip():
+            continue
+        try:
+            try:
+                event = json.loads(line)
+            except ValueError as e:
+                raise EventValidationError(("line", number), f"invalid JSON: {e}")
+            event = validate_event(event, ("line", number))
+            problem = check(event) if check is not None else None
+            if problem:
+                raise EventValidationError(("line", number), problem)
+            events.append(event)
+        except EventValidationError as e:
+            errors.append(e)
+    return events, errors
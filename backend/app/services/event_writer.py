@@ -0,0 +1,243 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+from google.api_core import exceptions as api_exceptions
+from config import settings
+from app.utils.firebase_client import get_db
+
+logger = logging.getLogger(__name__)
+
+# Firestore's limit on writes per batch commit
+FIRESTORE_MAX_BATCH_WRITES = 500
+_COMMIT_RETRIES = 3
+_RETRY_BACKOFF_SECONDS = 0.5
+# Firestore document limits
+_MAX_DOCUMENT_BYTES = 1024 * 1024
+_MAX_NESTING_DEPTH = 20
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+# Errors worth retrying as-is; anything else means some document in the batch is bad
+_TRANSIENT_ERRORS = (
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.DeadlineExceeded,
+    api_exceptions.InternalServerError,
+    api_exceptions.TooManyRequests,
+    api_exceptions.Aborted,
+    api_exceptions.Unknown,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+def firestore_encoding_error(payload: Dict[str, Any]) -> Optional[str]:
+    """Why Firestore would reject this JSON-decoded event as a document, or None if it is fine.
+
+    Checked when events are accepted, so a bad event fails its own request
+    instead of the shared batch it would be committed in.
+    """
+    size = 0
+    # (value, depth, inside an array)
+    stack = [(payload, 0, False)]
+    while stack:
+        value, depth, in_array = stack.pop()
+        if isinstance(value, dict):
+            if depth > _MAX_NESTING_DEPTH:
+                return f"values are nested deeper than {_MAX_NESTING_DEPTH} levels"
+            for key, item in value.items():
+                if not key or (key.startswith("__") and key.endswith("__")):
+                    return f"invalid field name {key!r}"
+                size += len(key.encode("utf-8")) + 1
+                stack.append((item, depth + 1, False))
+        elif isinstance(value, list):
+            if in_array:
+                return "arrays cannot directly contain arrays"
+            if depth > _MAX_NESTING_DEPTH:
+                return f"values are nested deeper than {_MAX_NESTING_DEPTH} levels"
+            stack.extend((item, depth + 1, True) for item in value)
+        elif isinstance(value, str):
+            size += len(value.encode("utf-8")) + 1
+        elif isinstance(value, bool) or value is None:
+            size += 1
+        elif isinstance(value, int):
+            if not _INT64_MIN <= value <= _INT64_MAX:
+                return f"integer {value} does not fit in 64 bits"
+            size += 8
+        elif isinstance(value, float):
+            size += 8
+        else:
+            return f"unsupported value type {type(value).__name__}"
+        if size > _MAX_DOCUMENT_BYTES:
+            return "event is larger than Firestore's 1 MiB document limit"
+    return None
+
+
+class EventWriteBehind:
+    """Buffers behavioral events in memory and writes them to Firestore in the background.
+
+    Events accepted from any number of requests are merged into commits of up
+    to max_batch writes. A commit happens as soon as a full batch is pending,
+    or when the oldest pending event has waited flush_interval_ms. Capacity is
+    reserved before a request is accepted, so a full buffer turns into
+    backpressure (the caller gets False from reserve) instead of unbounded
+    memory. stop() drains everything still pending.
+
+    Transient commit errors are retried; a batch that still fails is logged
+    and dropped, since clients have already been acknowledged. Any other
+    error means a document is bad, so the batch is split in half until the
+    offending events are isolated and only those are dropped.
+    """
+
+    def __init__(
+        self,
+        collection: str = "behavioral_events",
+        max_batch: int = FIRESTORE_MAX_BATCH_WRITES,
+        flush_interval_ms: int = 1000,
+        max_pending: int = 50000,
+        db_factory: Callable[[], Any] = get_db,
+    ):
+        self.collection = collection
+        self.max_batch = min(max_batch, FIRESTORE_MAX_BATCH_WRITES)
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_pending = max_pending
+        self.db_factory = db_factory
+        self.committed = 0
+        self.dropped = 0
+
+        self._pending: Deque[Dict[str, Any]] = deque()
+        self._oldest_at: Optional[float] = None
+        self._reserved = 0
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Flush everything pending, then stop the writer thread."""
+        with self._cond:
+            thread = self._thread
+            self._stopping = True
+            self._cond.notify()
+        if thread is not None:
+            thread.join(timeout)
+        with self._cond:
+            self._thread = None
+
+    def reserve(self, count: int) -> bool:
+        """Claim room for count events; False means the buffer is full."""
+        with self._cond:
+            if self._stopping or len(self._pending) + self._reserved + count > self.max_pending:
+                return False
+            self._reserved += count
+            return True
+
+    def submit(self, payloads: List[Dict[str, Any]], reserved: int) -> None:
+        """Queue payloads against a reservation of `reserved` slots (unused slots are released)."""
+        with self._cond:
+            self._reserved -= reserved
+            if not payloads:
+                return
+            if self._oldest_at is None:
+                self._oldest_at = time.monotonic()
+            self._pending.extend(payloads)
+            self._cond.notify()
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _take_batch(self) -> Optional[List[Dict[str, Any]]]:
+        """Block until a batch is due; None once stopped and drained."""
+        with self._cond:
+            while True:
+                if self._pending:
+                    full = len(self._pending) >= self.max_batch
+                    wait = self._oldest_at + self.flush_interval - time.monotonic()
+                    if full or wait <= 0 or self._stopping:
+                        count = min(self.max_batch, len(self._pending))
+                        batch = [self._pending.popleft() for _ in range(count)]
+                        if not self._pending:
+                            self._oldest_at = None
+                        return batch
+                    self._cond.wait(wait)
+                elif self._stopping:
+                    return None
+                else:
+                    self._cond.wait()
+
+    def _commit(self, batch: List[Dict[str, Any]]) -> None:
+        for attempt in range(_COMMIT_RETRIES):
+            try:
+                db = self.db_factory()
+                write_batch = db.batch()
+                collection = db.collection(self.collection)
+                for payload in batch:
+                    write_batch.set(collection.document(), payload)
+                write_batch.commit()
+                self.committed += len(batch)
+                return
+            except Exception as e:
+                if not isinstance(e, _TRANSIENT_ERRORS):
+                    self._bisect(batch, e)
+                    return
+                if attempt + 1 == _COMMIT_RETRIES:
+                    self.dropped += len(batch)
+                    logger.error(f"Dropping {len(batch)} events after {_COMMIT_RETRIES} failed commits: {e}")
+                    return
+                logger.warning(f"Event commit failed (attempt {attempt + 1}), retrying: {e}")
+                time.sleep(_RETRY_BACKOFF_SECONDS * 2 ** attempt)
+
+    def _bisect(self, batch: List[Dict[str, Any]], error: Exception) -> None:
+        """Commit the halves separately so one rejected event cannot sink the rest."""
+        if len(batch) == 1:
+            self.dropped += 1
+            logger.error(f"Dropping event rejected by Firestore: {error}")
+            return
+        middle = len(batch) // 2
+        self._commit(batch[:middle])
+        self._commit(batch[middle:])
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            self._commit(batch)
+
+
+_writer: Optional[EventWriteBehind] = None
+_writer_lock = threading.Lock()
+
+
+def get_event_writer() -> Optional[EventWriteBehind]:
+    """The process-wide write-behind queue, or None when ANALYTICS_WRITE_BEHIND is off."""
+    global _writer
+    if _writer is None and settings.ANALYTICS_WRITE_BEHIND:
+        with _writer_lock:
+            if _writer is None:
+                writer = EventWriteBehind(
+                    flush_interval_ms=settings.ANALYTICS_FLUSH_INTERVAL_MS,
+                    max_pending=settings.ANALYTICS_MAX_PENDING_EVENTS,
+                )
+                writer.start()
+                _writer = writer
+    return _writer
+
+
+def stop_event_writer(timeout: Optional[float] = None) -> None:
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.stop(timeout)
+            logger.info(
+                f"Event writer stopped: {_writer.committed} events written, "
+                f"{_writer.dropped} dropped, {_writer.pending()} left unwritten"
+            )
+            _writer = None
@@ -0,0 +1,424 @@
+"""Server-side freeze detection over the behavioral event stream.
+
+Evaluates the FreezeDetector rules from docs/FREEZE_DETECTION.md whose
+signals reach /api/analytics/event (exploration stall and scroll
+indecision) for every session as its events are ingested, so thresholds can
+be observed and tuned across all sessions without querying Firestore. Card
+re-clicking and dismissal escalation depend on events the frontend only
+sends to its analytics providers, so they are not evaluated here.
+
+Each session keeps small windowed state that is updated in O(1) amortized
+time per event: a scroll window with a running distance and direction
+reversal count. Rules run on the session's own event timestamps, so
+batched or replayed uploads give the same results as live traffic. Exploration stall depends on the absence of
+events and is additionally checked by a periodic sweep, like the browser's
+3-second interval. Sessions are kept in least-recently-active order, are
+dropped after sitting idle, and their number is capped.
+
+State is per process: with several workers, a session is only fully seen
+when its requests reach the same worker.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+CARD_VIEW_EVENTS = frozenset({"venue_view"})
+SCROLL_EVENTS = frozenset({"scroll_event"})
+
+GENTLE = "GENTLE"
+MODERATE = "MODERATE"
+
+# Per-session caps; a session beyond them still works, it just stops
+# remembering more of the same thing
+_MAX_CARDS_PER_SESSION = 1000
+_MAX_SCROLLS_PER_WINDOW = 512
+_RECENT_DETECTIONS = 1000
+
+# Sessions a sweep handles per lock hold, so event intake is never queued
+# behind a sweep over a large session table
+_SWEEP_CHUNK = 1000
+
+
+class FreezeConfig:
+    """Rule thresholds, defaulting to what the frontend FreezeDetector uses
+    (docs/FREEZE_DETECTION.md lists 7 cards and 50 px as starting points)."""
+
+    def __init__(
+        self,
+        stall_min_cards: int = 3,
+        stall_gentle_ms: int = 90000,
+        stall_moderate_ms: int = 120000,
+        scroll_window_ms: int = 90000,
+        scroll_min_distance_px: float = 40,
+        scroll_total_distance_px: float = 800,
+        scroll_reversals: int = 5,
+        cooldown_ms: int = 120000,
+    ):
+        self.stall_min_cards = stall_min_cards
+        self.stall_gentle_ms = stall_gentle_ms
+        self.stall_moderate_ms = stall_moderate_ms
+        self.scroll_window_ms = scroll_window_ms
+        self.scroll_min_distance_px = scroll_min_distance_px
+        self.scroll_total_distance_px = scroll_total_distance_px
+        self.scroll_reversals = scroll_reversals
+        self.cooldown_ms = cooldown_ms
+
+
+class _SessionState:
+    __slots__ = (
+        "session_id", "user_id", "started_ms", "clock_ms", "last_activity_ms",
+        "skew_ms", "seen_wall_ms", "cards", "scrolls", "scroll_distance",
+        "scroll_reversals", "cooldown_until_ms", "stall_fired_for",
+    )
+
+    def __init__(self, session_id: str, ts: int, wall_ms: int):
+        self.session_id = session_id
+        self.user_id: Optional[str] = None
+        self.started_ms = ts
+        self.clock_ms = ts
+        self.last_activity_ms = ts
+        # Event time lags server time by this much (client clock and batching)
+        self.skew_ms = wall_ms - ts
+        self.seen_wall_ms = wall_ms
+        self.cards = set()
+        self.scrolls: Deque[Tuple[int, str, float]] = deque()
+        self.scroll_distance = 0.0
+        self.scroll_reversals = 0
+        self.cooldown_until_ms = 0
+        # last_activity_ms of the idle period an exploration stall fired for
+        self.stall_fired_for: Optional[int] = None
+
+
+def _timestamp(event: Dict[str, Any]) -> Optional[int]:
+    value = event.get("timestamp")
+    return value if isinstance(value, int) else None
+
+
+class FreezeEngine:
+    """Incremental freeze detection for many concurrent sessions."""
+
+    def __init__(
+        self,
+        config: Optional[FreezeConfig] = None,
+        max_sessions: int = 50000,
+        session_idle_ms: int = 30 * 60 * 1000,
+        on_freeze: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        self.config = config or FreezeConfig()
+        self.max_sessions = max_sessions
+        self.session_idle_ms = session_idle_ms
+        self.on_freeze = on_freeze
+        self.events_processed = 0
+        self.sessions_evicted = 0
+        self.detection_counts: Dict[Tuple[str, str], int] = {}
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=_RECENT_DETECTIONS)
+
+        # Least recently active first. seen_wall_ms never decreases along
+        # this order (see _touch), which lets sweeps stop at the first
+        # session that was seen too recently.
+        self._sessions: "OrderedDict[str, _SessionState]" = OrderedDict()
+        self._latest_wall_ms = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    # Event intake
+
+    def process(self, events: List[Dict[str, Any]], wall_ms: int) -> List[Dict[str, Any]]:
+        """Feed ingested events (with session_id and timestamp set) and return any detections."""
+        detections: List[Dict[str, Any]] = []
+        with self._lock:
+            for event in events:
+                ts = _timestamp(event)
+                session_id = event.get("session_id")
+                if ts is None or not session_id:
+                    continue
+                self._process_event(self._touch(session_id, wall_ms, ts), event, ts, wall_ms, detections)
+                self.events_processed += 1
+            self._evict_over_capacity()
+            self._record(detections)
+        self._notify(detections)
+        return detections
+
+    def _touch(self, session_id: str, wall_ms: int, ts: int) -> _SessionState:
+        """Session for an incoming event, moved to the most recently seen end.
+
+        Batches can take the lock in a different order than their wall_ms
+        was read, so the time recorded is clamped to never go backwards.
+        """
+        self._latest_wall_ms = max(self._latest_wall_ms, wall_ms)
+        state = self._sessions.get(session_id)
+        if state is None:
+            state = _SessionState(session_id, ts, wall_ms)
+            self._sessions[session_id] = state
+        else:
+            self._sessions.move_to_end(session_id)
+        state.seen_wall_ms = self._latest_wall_ms
+        return state
+
+    def _process_event(self, state: _SessionState, event: Dict[str, Any], ts: int, wall_ms: int,
+                       detections: list) -> None:
+        # Session clock only moves forward; late events are treated as happening now
+        now = max(ts, state.clock_ms)
+        state.clock_ms = now
+        state.skew_ms = wall_ms - now
+        if event.get("user_id"):
+            state.user_id = event["user_id"]
+
+        event_type = event.get("event_type")
+        if event_type not in CARD_VIEW_EVENTS and event_type not in SCROLL_EVENTS:
+            return
+
+        # An idle gap that ends with this event may itself have been a stall
+        self._check_stall(state, now, detections, closing_gap=True)
+        state.last_activity_ms = now
+
+        venue_id = event.get("venue_id")
+        if event_type in CARD_VIEW_EVENTS:
+            if venue_id and len(state.cards) < _MAX_CARDS_PER_SESSION:
+                state.cards.add(str(venue_id))
+        else:
+            self._record_scroll(state, event, now, detections)
+
+    # Rules
+
+    def _check_stall(self, state: _SessionState, now: int, detections: list, closing_gap: bool = False) -> None:
+        config = self.config
+        if len(state.cards) < config.stall_min_cards:
+            return
+        idle = now - state.last_activity_ms
+        if idle >= config.stall_moderate_ms:
+            level, threshold = MODERATE, config.stall_moderate_ms
+        elif idle >= config.stall_gentle_ms:
+            level, threshold = GENTLE, config.stall_gentle_ms
+        else:
+            return
+        if closing_gap:
+            if state.stall_fired_for == state.last_activity_ms:
+                return
+            # Fire at the moment the threshold was crossed, not when activity resumed
+            now = state.last_activity_ms + threshold
+        if self._trigger(state, "exploration_stall", level, now, detections, {
+            "idle_seconds": round((threshold if closing_gap else idle) / 1000),
+        }):
+            state.stall_fired_for = state.last_activity_ms
+
+    def _record_scroll(self, state: _SessionState, event: Dict[str, Any], now: int, detections: list) -> None:
+        config = self.config
+        direction = event.get("scroll_direction")
+        distance = event.get("scroll_distance_px")
+        if direction not in ("up", "down") or not isinstance(distance, (int, float)):
+            return
+        distance = abs(distance)
+        if distance < config.scroll_min_distance_px:
+            return
+
+        scrolls = state.scrolls
+        if scrolls and scrolls[-1][1] != direction:
+            state.scroll_reversals += 1
+        scrolls.append((now, direction, distance))
+        state.scroll_distance += distance
+        while scrolls and (now - scrolls[0][0] >= config.scroll_window_ms or len(scrolls) > _MAX_SCROLLS_PER_WINDOW):
+            _, old_direction, old_distance = scrolls.popleft()
+            state.scroll_distance -= old_distance
+            if scrolls and scrolls[0][1] != old_direction:
+                state.scroll_reversals -= 1
+
+        if state.scroll_distance >= config.scroll_total_distance_px and state.scroll_reversals >= config.scroll_reversals:
+            self._trigger(state, "scroll_indecision", GENTLE, now, detections, {
+                "scroll_cycles": state.scroll_reversals // 2,
+                "total_scroll_distance": round(state.scroll_distance),
+            })
+
+    def _trigger(self, state: _SessionState, rule: str, level: str, now: int,
+                 detections: list, context: Dict[str, Any]) -> bool:
+        if now < state.cooldown_until_ms:
+            return False
+        state.cooldown_until_ms = now + self.config.cooldown_ms
+        detections.append({
+            "session_id": state.session_id,
+            "user_id": state.user_id,
+            "rule": rule,
+            "level": level,
+            "timestamp": now,
+            "context": {
+                "cards_viewed": len(state.cards),
+                "scroll_events": len(state.scrolls),
+                "time_on_screen_seconds": round((now - state.started_ms) / 1000),
+                **context,
+            },
+        })
+        return True
+
+    # Time-driven checks and eviction
+
+    def sweep(self, wall_ms: int) -> List[Dict[str, Any]]:
+        """Check idle sessions for exploration stalls and evict long-idle sessions.
+
+        Both passes only look at the front of the last-seen order and stop
+        at the first session seen too recently, and the lock is released
+        every _SWEEP_CHUNK sessions.
+        """
+        while self._evict_idle(wall_ms):
+            pass
+
+        # Only sessions without events for the gentle threshold can be
+        # stalled now. They are copied out and checked chunk by chunk,
+        # since the order cannot be iterated across lock releases.
+        candidates: List[_SessionState] = []
+        with self._lock:
+            for state in self._sessions.values():
+                if wall_ms - state.seen_wall_ms < self.config.stall_gentle_ms:
+                    break
+                if len(state.cards) >= self.config.stall_min_cards:
+                    candidates.append(state)
+
+        detections: List[Dict[str, Any]] = []
+        for start in range(0, len(candidates), _SWEEP_CHUNK):
+            with self._lock:
+                for state in candidates[start:start + _SWEEP_CHUNK]:
+                    # Evicted or active again since the copy
+                    if self._sessions.get(state.session_id) is not state \
+                            or wall_ms - state.seen_wall_ms < self.config.stall_gentle_ms:
+                        continue
+                    self._check_stall(state, wall_ms - state.skew_ms, detections)
+        with self._lock:
+            self._record(detections)
+        self._notify(detections)
+        return detections
+
+    def _evict_idle(self, wall_ms: int) -> bool:
+        """Drop up to _SWEEP_CHUNK sessions idle for session_idle_ms. True if more may be due."""
+        with self._lock:
+            for _ in range(_SWEEP_CHUNK):
+                if not self._sessions:
+                    return False
+                state = next(iter(self._sessions.values()))
+                if wall_ms - state.seen_wall_ms < self.session_idle_ms:
+                    return False
+                self._sessions.popitem(last=False)
+                self.sessions_evicted += 1
+            return True
+
+    def _evict_over_capacity(self) -> None:
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.sessions_evicted += 1
+
+    def _record(self, detections: List[Dict[str, Any]]) -> None:
+        """Count detections. Caller holds the lock."""
+        for detection in detections:
+            key = (detection["rule"], detection["level"])
+            self.detection_counts[key] = self.detection_counts.get(key, 0) + 1
+            self.recent.append(detection)
+
+    def _notify(self, detections: List[Dict[str, Any]]) -> None:
+        for detection in detections:
+            logger.info(
+                f"Freeze detected: {detection['rule']} ({detection['level']}) "
+                f"in session {detection['session_id']}"
+            )
+            if self.on_freeze is not None:
+                try:
+                    self.on_freeze(detection)
+                except Exception as e:
+                    logger.error(f"Freeze detection callback failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        detections: Dict[str, Dict[str, int]] = {}
+        with self._lock:
+            for (rule, level), count in sorted(self.detection_counts.items()):
+                detections.setdefault(rule, {})[level] = count
+            return {
+                "active_sessions": len(self._sessions),
+                "events_processed": self.events_processed,
+                "sessions_evicted": self.sessions_evicted,
+                "detections": detections,
+            }
+
+    def recent_detections(self, session_id: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Latest detections first, optionally for one session."""
+        with self._lock:
+            recent = list(self.recent)
+        if session_id:
+            recent = [detection for detection in recent if detection["session_id"] == session_id]
+        return recent[::-1][:limit]
+
+    # Background sweeping
+
+    def start(self, interval_ms: int = 3000, clock: Optional[Callable[[], int]] = None) -> None:
+        if self._thread is not None:
+            return
+        clock = clock or _wall_ms
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval_ms / 1000):
+                try:
+                    self.sweep(clock())
+                except Exception as e:
+                    logger.error(f"Freeze sweep failed: {e}")
+
+        self._thread = threading.Thread(target=run, name="freeze-sweep", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def _wall_ms() -> int:
+    return int(time.time() * 1000)
+
+
+_engine: Optional[FreezeEngine] = None
+_engine_lock = threading.Lock()
+
+
+def _log_detection(detection: Dict[str, Any]) -> None:
+    """Keep detections next to the raw events when the local event log is on."""
+    from app.services.event_log import get_event_log
+
+    event_log = get_event_log()
+    if event_log is not None:
+        event_log.append([{
+            "event_type": "server_freeze_detected",
+            "session_id": detection["session_id"],
+            "timestamp": detection["timestamp"],
+            "rule": detection["rule"],
+            "level": detection["level"],
+            "context": detection["context"],
+        }])
+
+
+def get_freeze_engine() -> Optional[FreezeEngine]:
+    """The process-wide engine, or None when FREEZE_ENGINE_ENABLED is off."""
+    global _engine
+    if _engine is None and settings.FREEZE_ENGINE_ENABLED:
+        with _engine_lock:
+            if _engine is None:
+                _engine = FreezeEngine(
+                    max_sessions=settings.FREEZE_ENGINE_MAX_SESSIONS,
+                    session_idle_ms=settings.FREEZE_ENGINE_SESSION_IDLE_MINUTES * 60 * 1000,
+                    on_freeze=_log_detection,
+                )
+                _engine.start()
+    return _engine
+
+
+def stop_freeze_engine() -> None:
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.stop()
+            _engine = None
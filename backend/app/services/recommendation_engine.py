@@ -1,55 +1,255 @@
+import hashlib
+import json
+import random
 import threading
-from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from typing import List, Dict, Any, Optional
-from math import radians, sin, cos, sqrt, atan2
-from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+from math import floor, radians, sin, cos, sqrt, atan2
+from datetime import datetime, timedelta, timezone
 from google.cloud.firestore_v1 import Query
+from config import settings
 from app.utils.firebase_client import get_db, get_user
+from app.utils.single_flight import SingleFlight
+from app.utils.ttl_cache import TTLCache
 from app.services.embedding_service import generate_session_embedding, generate_user_embedding
+from app.services.scoring_matrix import ScoringMatrix
+from app.services.venue_snapshot import load_snapshot, read_manifest, snapshot_lock, write_snapshot
+from app.services.venue_source import FirestoreVenueSource, latest_update
+from app.services.venue_store import VenueStore
+from app.utils.embedding_codec import without_embeddings
 
 _trending_cache: Dict[str, Any] = {"data": None, "fetched_at": None}
 _TRENDING_MEM_TTL_MINUTES = 60    # in-memory L1: avoids Firestore reads on hot path
 _TRENDING_FS_TTL_HOURS = 24       # Firestore L2: persists across restarts and instances
 _TRENDING_CACHE_DOC = ("cache", "trending")
 
-# Venue collection cache — keyed by activity so each filter bucket is cached independently.
-_venues_cache: Dict[str, Any] = {}   # { activity: {"data": [...], "fetched_at": datetime} }
+# Venue catalogue cache — one canonical store for every activity; activity
+# filters are posting lists on the store rather than separate copies.
+# The dict is replaced wholesale on refresh so readers always see one snapshot.
+_EMPTY_VENUE_CACHE: Dict[str, Any] = {
+    "store": None,
+    "fetched_at": None,        # last full load
+    "expires_at": None,        # jittered so workers don't all reload at once
+    "synced_to": None,         # delta watermark: venues updated after it are fetched next
+    "delta_checked_at": None,  # last incremental refresh attempt
+    "retry_at": None,          # backoff after a failed background refresh
+    "snapshot_version": None,  # on-disk snapshot the store is mapped from, if any
+}
+_venue_store_cache: Dict[str, Any] = dict(_EMPTY_VENUE_CACHE)
 _VENUES_CACHE_TTL_MINUTES = 60 * 24
-_venues_cache_lock = threading.Lock()
+_VENUES_CACHE_JITTER = 0.1
+_VENUES_REFRESH_RETRY_SECONDS = 60
+# Held by whichever thread is building a new store; never by readers
+_venue_store_lock = threading.Lock()
+_venue_source = FirestoreVenueSource()
+
+# Recent recommendation lists. Keys end with the venue store version, so a
+# refreshed catalogue is never answered from entries computed on the old one,
+# and start with the user id, which groups them for per-user invalidation.
+_recommendation_cache = TTLCache(
+    settings.RECOMMENDATION_CACHE_SIZE,
+    settings.RECOMMENDATION_CACHE_TTL_SECONDS,
+    group=lambda key: key[0],
+)
+# Concurrent misses for the same cache key share one computation
+_recommendation_flights = SingleFlight()
+
+
+def set_venue_source(source) -> None:
+    """Swap where venues are loaded from (e.g. InMemoryVenueSource offline) and drop the cache."""
+    global _venue_source, _venue_store_cache
+    with _venue_store_lock:
+        _venue_source = source
+        _venue_store_cache = dict(_EMPTY_VENUE_CACHE)
+
+
+def _build_store(venues: List[Dict[str, Any]]) -> VenueStore:
+    # Scoring arrays are derived once per load, not per request
+    store = VenueStore(venues)
+    if settings.VENUE_ANN_ENABLED and len(store) >= settings.VENUE_ANN_MIN_VENUES:
+        store.build_ann_index(settings.VENUE_ANN_LISTS)
+    return _with_scoring_matrix(store)
+
+
+def _with_scoring_matrix(store: VenueStore) -> VenueStore:
+    """Attach the reduced-precision scoring matrix when one is configured.
+
+    Not persisted in snapshots: it depends on per-deployment settings and is
+    a fraction of the size of the full matrix. The full matrix is then only
+    read for re-ranking, so it is moved out of the heap into a mapped file.
+    """
+    if settings.VENUE_SCORING_PRECISION != "float32" or settings.VENUE_SCORING_DIMS:
+        store.build_scoring_matrix(
+            settings.VENUE_SCORING_PRECISION,
+            settings.VENUE_SCORING_DIMS,
+            settings.VENUE_SCORING_REDUCTION,
+        )
+        store.spill_embeddings()
+    return store
+
+
+def _venue_refresh_due(cache: Dict[str, Any]) -> bool:
+    now = datetime.utcnow()
+    if cache["retry_at"] is not None and now < cache["retry_at"]:
+        return False
+    if now >= cache["expires_at"]:
+        return True
+    if settings.VENUE_DELTA_REFRESH_SECONDS <= 0:
+        return False
+    return now - cache["delta_checked_at"] >= timedelta(seconds=settings.VENUE_DELTA_REFRESH_SECONDS)
+
+
+def _expiry(fetched_at: datetime) -> datetime:
+    ttl = timedelta(minutes=_VENUES_CACHE_TTL_MINUTES) * (1 - random.uniform(0, _VENUES_CACHE_JITTER))
+    return fetched_at + ttl
 
 
-def _get_venues(activity: str) -> List[Dict[str, Any]]:
-    """Return venues for the given activity, using in-memory cache with TTL.
+def _refresh_from_source() -> None:
+    """Full reload when expired, otherwise apply venues changed since the last sync."""
+    global _venue_store_cache
+    cache = _venue_store_cache
+    now = datetime.utcnow()
+
+    if cache["store"] is None or now >= cache["expires_at"]:
+        # A scan is not a point-in-time read: a venue written after its page
+        # was read can be older than one read later, so the next delta starts
+        # from before the scan. Re-applying venues the scan already saw is harmless.
+        started_at = datetime.now(timezone.utc)
+        venues = _venue_source.load_all()
+        store = _build_store(venues)
+        _venue_store_cache = {
+            **_EMPTY_VENUE_CACHE,
+            "store": store,
+            "fetched_at": now,
+            "expires_at": _expiry(now),
+            "synced_to": started_at,
+            "delta_checked_at": now,
+        }
+        print(f"[venues] Loaded {len(venues)} venues")
+        return
+
+    changes = _venue_source.load_changes(cache["synced_to"])
+    if changes:
+        _venue_store_cache = {
+            **cache,
+            "store": _with_scoring_matrix(cache["store"].apply_changes(changes)),
+            "synced_to": latest_update(changes),
+            "delta_checked_at": now,
+            "retry_at": None,
+            "snapshot_version": None,
+        }
+        print(f"[venues] Applied {len(changes)} changed venues")
+    else:
+        _venue_store_cache = {**cache, "delta_checked_at": now, "retry_at": None}
+
 
-    Fast path: read without lock (dict reads are thread-safe in CPython).
-    Slow path: acquire lock, double-check, fetch from Firestore, populate cache.
-    This prevents multiple simultaneous cold-start requests from all hitting Firestore.
+def _adopt_snapshot(store: VenueStore, manifest: Dict[str, Any], expires_at: Optional[datetime] = None,
+                    scoring: Optional[ScoringMatrix] = None) -> None:
+    global _venue_store_cache
+    if scoring is not None:
+        store.scoring = scoring
+    else:
+        _with_scoring_matrix(store)
+    _venue_store_cache = {
+        **_EMPTY_VENUE_CACHE,
+        "store": store,
+        "fetched_at": manifest["fetched_at"],
+        "expires_at": expires_at or _expiry(manifest["fetched_at"]),
+        "synced_to": manifest["synced_to"],
+        "delta_checked_at": datetime.fromisoformat(manifest["created_at"]),
+        "snapshot_version": manifest["version"],
+    }
+
+
+def _refresh_venue_store() -> None:
+    """Bring the cached store up to date and publish it with a single assignment.
+
+    With VENUE_SNAPSHOT_DIR set, workers on a host cooperate through the
+    on-disk snapshot: under a cross-process lock, a newer snapshot written by
+    another worker is adopted as-is; otherwise this worker refreshes from the
+    source, writes a new snapshot and switches to the memory-mapped copy so
+    every worker shares the same pages. Caller must hold _venue_store_lock.
+    """
+    snapshot_dir = settings.VENUE_SNAPSHOT_DIR
+    if not snapshot_dir:
+        _refresh_from_source()
+        return
+
+    with snapshot_lock(snapshot_dir):
+        manifest = read_manifest(snapshot_dir)
+        if (
+            manifest is not None
+            and manifest["version"] != _venue_store_cache["snapshot_version"]
+            and datetime.utcnow() - manifest["fetched_at"] < timedelta(minutes=_VENUES_CACHE_TTL_MINUTES)
+        ):
+            loaded = load_snapshot(snapshot_dir)
+            if loaded is not None:
+                _adopt_snapshot(*loaded)
+                print(f"[venues] Mapped snapshot {manifest['version']} ({manifest['count']} venues)")
+                if not _venue_refresh_due(_venue_store_cache):
+                    return
+
+        before = _venue_store_cache["store"]
+        _refresh_from_source()
+        cache = _venue_store_cache
+        if cache["store"] is before:
+            return
+        try:
+            write_snapshot(cache["store"], snapshot_dir, cache["fetched_at"], cache["synced_to"])
+            loaded = load_snapshot(snapshot_dir)
+            if loaded is not None:
+                # Same rows in the same order: keep this worker's jittered
+                # expiry and the scoring matrix it just built
+                _adopt_snapshot(*loaded, expires_at=cache["expires_at"], scoring=cache["store"].scoring)
+        except OSError as e:
+            print(f"[venues] Snapshot write failed, keeping in-process store: {e}")
+
+
+def _background_refresh() -> None:
+    global _venue_store_cache
+    try:
+        _refresh_venue_store()
+    except Exception as e:
+        retry_at = datetime.utcnow() + timedelta(seconds=_VENUES_REFRESH_RETRY_SECONDS)
+        _venue_store_cache = {**_venue_store_cache, "retry_at": retry_at}
+        print(f"[venues] Background refresh failed, serving stale store: {e}")
+    finally:
+        _venue_store_lock.release()
+
+
+def _get_venue_store() -> VenueStore:
+    """Return the venue store, stale-while-revalidate.
+
+    Once a store exists it is always returned immediately. When it has
+    expired (or an incremental refresh is due, see VENUE_DELTA_REFRESH_SECONDS)
+    one background thread rebuilds it and swaps it in; concurrent requests
+    keep serving the old snapshot. Only the very first load blocks, and the
+    lock ensures simultaneous cold-start requests hit Firestore once (once
+    per host when VENUE_SNAPSHOT_DIR is set).
     """
-    entry = _venues_cache.get(activity)
-    if entry and datetime.utcnow() - entry["fetched_at"] < timedelta(minutes=_VENUES_CACHE_TTL_MINUTES):
-        return entry["data"]
+    cache = _venue_store_cache
+    if cache["store"] is not None:
+        if _venue_refresh_due(cache) and _venue_store_lock.acquire(blocking=False):
+            threading.Thread(target=_background_refresh, daemon=True).start()
+        return cache["store"]
 
-    with _venues_cache_lock:
+    with _venue_store_lock:
         # Re-check inside lock — another thread may have populated it while we waited
-        entry = _venues_cache.get(activity)
-        if entry and datetime.utcnow() - entry["fetched_at"] < timedelta(minutes=_VENUES_CACHE_TTL_MINUTES):
-            return entry["data"]
+        if _venue_store_cache["store"] is None:
+            _refresh_venue_store()
+        return _venue_store_cache["store"]
 
-        db = get_db()
-        query = db.collection("venues")
-        if activity and activity != "any":
-            query = query.where("activity", "==", activity)
-        query = query.limit(1000)
 
-        venues = []
-        for doc in query.stream():
-            d = doc.to_dict()
-            d["doc_id"] = doc.id
-            venues.append(d)
+def warm_venue_store() -> None:
+    """Called at startup: load the venue store in the background so the first
+    recommendation request doesn't pay for the full collection scan."""
+    def _warm():
+        try:
+            _get_venue_store()
+        except Exception as e:
+            print(f"[venues] Warm failed: {e}")
 
-        _venues_cache[activity] = {"data": venues, "fetched_at": datetime.utcnow()}
-        return venues
+    threading.Thread(target=_warm, daemon=True).start()
 
 
 def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
@@ -77,6 +277,140 @@ def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     return R * c
 
 
+def _build_result(venue: Dict[str, Any], lat: float, lon: float, distance: float,
+                  similarity: float, score: float) -> Dict[str, Any]:
+    return {
+        "venue_id": venue.get("doc_id") or venue.get("place_id"),
+        "name": venue.get("name"),
+        "activity": venue.get("activity"),
+        "category": venue.get("category"),
+        "location": {
+            "latitude": lat,
+            "longitude": lon,
+        },
+        "address": venue.get("address"),
+        "distance_km": round(distance, 2),
+        "rating": venue.get("rating"),
+        "reviews_count": venue.get("reviews_count", 0),
+        "price_level": venue.get("price_level", 0),
+        "website": venue.get("website"),
+        "phone": venue.get("phone"),
+        "opening_hours": venue.get("opening_hours", {}),
+        "photo": venue.get("photo"),
+        "similarity_score": round(similarity, 4),
+        "solo_score": venue.get("solo_score"),
+        "solo_reason": venue.get("solo_reason"),
+        "pro_tip": venue.get("pro_tip"),
+        "tags": venue.get("tags", []),
+        "combined_score": round(score, 4),
+    }
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k highest scores, best first.
+
+    Uses a partial partition so only the boundary ties and the winners are
+    sorted. Equal scores keep their input order, matching a stable full sort.
+    """
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        kth = np.partition(scores, n - k)[n - k]
+        candidates = np.flatnonzero(scores >= kth)
+    else:
+        candidates = np.arange(n)
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order[:k]]
+
+
+def _blend(similarities: np.ndarray, ratings: np.ndarray, distances: np.ndarray) -> np.ndarray:
+    distance_penalty = np.select([distances <= 5, distances <= 15], [0.0, 0.25], default=0.5)
+    return (similarities * 0.7 + ratings / 5.0 * 0.3) * (1 - distance_penalty)
+
+
+def score_venues(
+    store: VenueStore,
+    user_embedding: List[float],
+    user_lat: float,
+    user_lon: float,
+    budget: int,
+    radius_km: float,
+    activity: str = "any",
+    n_probe: Optional[int] = None,
+    rerank: Optional[int] = None,
+):
+    """Vectorized scoring over the venues near the user.
+
+    The store's spatial grid narrows the catalogue to nearby cells and the
+    activity posting list narrows those further, then exact haversine,
+    budget and distance-band masks run on the remaining candidates only.
+    When the store has an ANN index and n_probe is given, candidates are
+    further limited to the probed inverted lists before similarity is computed.
+    When the store has a reduced-precision scoring matrix and rerank is given,
+    candidates are scored approximately first and only the best rerank of
+    them are re-scored against the full-precision embeddings.
+    Returns (rows, distances, similarities, scores) for the venues that pass,
+    in store order.
+    """
+    # Venues beyond 20 km fall outside every distance band and are never scored
+    max_distance = min(radius_km, 20)
+    rows = store.rows_for_activity(store.rows_near(user_lat, user_lon, max_distance), activity)
+    distances = store.distances_from(user_lat, user_lon, rows)
+
+    mask = distances <= max_distance
+    price = store.price[rows]
+    mask &= (price <= budget + 1) | (price == 0)
+    rows = rows[mask]
+    distances = distances[mask]
+
+    if store.ann is not None and n_probe:
+        keep = store.ann.probed_lists(user_embedding, n_probe)[store.ann.assignments[rows]]
+        rows = rows[keep]
+        distances = distances[keep]
+
+    if store.scoring is not None and rerank and len(rows) > rerank:
+        approx = store.scoring.similarities(user_embedding, rows).astype(np.float64)
+        approx_scores = _blend(approx, store.rating[rows], distances)
+        shortlist = np.sort(np.argpartition(-approx_scores, rerank - 1)[:rerank])
+        rows = rows[shortlist]
+        distances = distances[shortlist]
+
+    similarities = store.similarities(user_embedding, rows).astype(np.float64)
+    scores = _blend(similarities, store.rating[rows], distances)
+    return rows, distances, similarities, scores
+
+
+def _session_fingerprint(session_preferences: Optional[dict]) -> str:
+    if not session_preferences:
+        return ""
+    canonical = json.dumps(session_preferences, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+def _recommendation_key(
+    store: VenueStore,
+    user_id: str,
+    user_lat: float,
+    user_lon: float,
+    session_preferences: Optional[dict],
+    activity: str,
+    radius_km: float,
+    limit: int,
+) -> Tuple:
+    cell = settings.RECOMMENDATION_CACHE_CELL_DEGREES
+    location = (floor(user_lat / cell), floor(user_lon / cell)) if cell > 0 else (user_lat, user_lon)
+    return (
+        user_id, activity, location, _session_fingerprint(session_preferences),
+        radius_km, limit, store.version,
+    )
+
+
+def invalidate_user_recommendations(user_id: str) -> None:
+    """Drop cached recommendation lists for a user, e.g. after a preferences update."""
+    _recommendation_cache.discard_group(user_id)
+
+
 def get_recommendations(
     user_id: str,
     user_lat: float,
@@ -86,20 +420,46 @@ def get_recommendations(
     radius_km: float = 20.0,
     limit: int = 5
 ) -> List[Dict[str, Any]]:
-    
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        user_future = executor.submit(get_user, user_id)
-        venues_future = executor.submit(_get_venues, activity)
-        user_data = user_future.result()
-        all_venues = venues_future.result()
+    """Ranked venues for a user near a location.
 
+    Results are cached per user, activity, location cell, session preferences
+    and limit; requests from within the same cell get the list computed for
+    the first of them (distance_km included). Identical requests that miss
+    the cache at the same time wait for a single computation.
+    """
+    store = _get_venue_store()
+    key = _recommendation_key(store, user_id, user_lat, user_lon, session_preferences, activity, radius_km, limit)
+    cached = _recommendation_cache.get(key)
+    if cached is not None:
+        return list(cached)
+
+    results = _recommendation_flights.do(
+        key, _compute_recommendations,
+        key, store, user_id, user_lat, user_lon, session_preferences, activity, radius_km, limit,
+    )
+    return list(results)
+
+
+def _compute_recommendations(
+    key: Tuple,
+    store: VenueStore,
+    user_id: str,
+    user_lat: float,
+    user_lon: float,
+    session_preferences: Optional[dict],
+    activity: str,
+    radius_km: float,
+    limit: int,
+) -> List[Dict[str, Any]]:
+    generation = _recommendation_cache.invalidations
+    user_data = get_user(user_id)
     if not user_data:
         raise ValueError(f"User {user_id} not found")
 
     onboarding_prefs = user_data.get("preferences", {})
     budget = onboarding_prefs.get("budget", 2)
     
-    if not all_venues:
+    if not len(store):
         return []
     
     if session_preferences:
@@ -109,75 +469,29 @@ def get_recommendations(
         if not user_embedding:
             user_embedding = generate_user_embedding(onboarding_prefs)
     
-    scored_venues = []
-    
-    for venue in all_venues:
-        if "embedding" not in venue:
-            continue
-        
-        location = venue.get("location", {})
-        venue_lat = location.get("latitude") or location.get("lat")
-        venue_lon = location.get("longitude") or location.get("lng")
-        
-        if not venue_lat or not venue_lon:
-            continue
-        
-        distance = haversine_distance(user_lat, user_lon, venue_lat, venue_lon)
-        
-        if distance > radius_km:
-            continue
-        
-        venue_price = venue.get("price_level", 0)
-        if venue_price > budget + 1 and venue_price != 0:
-            continue
-
-        venue_embedding = venue.get("embedding", [])
-        
-        similarity = cosine_similarity(user_embedding, venue_embedding)
-        
-        if distance <= 5:
-            distance_penalty = 0.0
-        elif distance <= 15:
-            distance_penalty = 0.25
-        elif distance <= 20:
-            distance_penalty = 0.5
-        else:
-            continue
-        
-        rating = venue.get("rating") or 0
-        normalized_rating = rating / 5.0
-        adjusted_score = (similarity * 0.7 + normalized_rating * 0.3) * (1 - distance_penalty)
-        
-        result = {
-            "venue_id": venue.get("doc_id") or venue.get("place_id"),
-            "name": venue.get("name"),
-            "activity": venue.get("activity"),
-            "category": venue.get("category"),
-            "location": {
-                "latitude": venue_lat,
-                "longitude": venue_lon,
-            },
-            "address": venue.get("address"),
-            "distance_km": round(distance, 2),
-            "rating": venue.get("rating"),
-            "reviews_count": venue.get("reviews_count", 0),
-            "price_level": venue_price,
-            "website": venue.get("website"),
-            "phone": venue.get("phone"),
-            "opening_hours": venue.get("opening_hours", {}),
-            "photo": venue.get("photo"),
-            "similarity_score": round(similarity, 4),
-            "solo_score": venue.get("solo_score"),
-            "solo_reason": venue.get("solo_reason"),
-            "pro_tip": venue.get("pro_tip"),
-            "tags": venue.get("tags", []),
-            "combined_score": round(adjusted_score, 4),
-        }
-        scored_venues.append(result)
-    
-    scored_venues.sort(key=lambda x: x["combined_score"], reverse=True)
-    
-    return scored_venues[:limit]
+    rows, distances, similarities, scores = score_venues(
+        store, user_embedding, user_lat, user_lon, budget, radius_km,
+        activity=activity,
+        n_probe=settings.VENUE_ANN_NPROBE,
+        rerank=settings.VENUE_RERANK_CANDIDATES,
+    )
+
+    # Only the winners are materialized into response dicts
+    top = top_k_indices(np.round(scores, 4), limit)
+
+    results = [
+        _build_result(
+            store.venues[rows[i]],
+            float(store.lat[rows[i]]),
+            float(store.lon[rows[i]]),
+            float(distances[i]),
+            float(similarities[i]),
+            float(scores[i]),
+        )
+        for i in top
+    ]
+    _recommendation_cache.set(key, results, generation=generation)
+    return results
 
 
 def _fetch_trending_from_source(limit: int = 10) -> List[Dict[str, Any]]:
@@ -190,7 +504,7 @@ def _fetch_trending_from_source(limit: int = 10) -> List[Dict[str, Any]]:
         .stream()
     results = []
     for doc in docs:
-        venue_data = doc.to_dict()
+        venue_data = without_embeddings(doc.to_dict())
         if venue_data.get("reviews_count", 0) >= 100:
             venue_data["venue_id"] = doc.id
             results.append(venue_data)
@@ -214,6 +528,8 @@ def _read_firestore_trending() -> Optional[Dict[str, Any]]:
             refreshed_at = datetime.fromisoformat(refreshed_at)
         if datetime.utcnow() - refreshed_at > timedelta(hours=_TRENDING_FS_TTL_HOURS):
             return None
+        # Caches written before the blob was stripped may still carry it
+        data["venues"] = [without_embeddings(venue) for venue in data.get("venues") or []]
         return data
     except Exception as e:
         print(f"[trending] Firestore cache read failed: {e}")
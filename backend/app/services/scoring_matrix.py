@@ -0,0 +1,91 @@
+import numpy as np
+from typing import List, Optional
+
+PRECISIONS = ("float32", "int8")
+REDUCTIONS = ("truncate", "pca")
+
+# Rows gathered and widened per step: small enough that the float32 staging
+# buffer stays in cache, large enough for the dot product to use BLAS
+_SCORE_CHUNK_ROWS = 256
+
+# Rows sampled to fit PCA components; the projection is then applied to every row
+_PCA_SAMPLE_ROWS = 20000
+
+
+class ScoringMatrix:
+    """Compact copy of the normalized embedding matrix for first-pass scoring.
+
+    Dimensions are optionally reduced, either by truncation (text-embedding-3
+    vectors are trained so leading dimensions carry most of the signal) or by
+    an uncentered PCA projection fitted on the catalogue. Rows are then
+    re-normalized and stored as float32, or int8 with a per-row scale.
+    Similarities from this matrix are approximate; callers re-rank a
+    shortlist against the full-precision embeddings.
+
+    float16 is not offered: numpy widens half floats in software, so scoring
+    them is slower than scoring float32 for only half the memory saving of int8.
+    """
+
+    def __init__(self, embeddings: np.ndarray, precision: str = "float32", dims: int = 0,
+                 reduction: str = "truncate", seed: int = 0):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown scoring precision {precision!r}; expected one of {PRECISIONS}")
+        if reduction not in REDUCTIONS:
+            raise ValueError(f"Unknown dimension reduction {reduction!r}; expected one of {REDUCTIONS}")
+
+        full_dim = embeddings.shape[1]
+        self.precision = precision
+        self.dims = dims if 0 < dims < full_dim else full_dim
+        self.projection: Optional[np.ndarray] = None
+
+        if self.dims < full_dim and reduction == "pca":
+            rng = np.random.default_rng(seed)
+            n = len(embeddings)
+            sample = embeddings[np.sort(rng.choice(n, min(n, _PCA_SAMPLE_ROWS), replace=False))]
+            # Uncentered: projecting both sides onto the top right singular
+            # vectors preserves dot products as well as a rank-k map can
+            _, _, vt = np.linalg.svd(np.asarray(sample, dtype=np.float32), full_matrices=False)
+            self.projection = np.ascontiguousarray(vt[:self.dims].T)
+
+        reduced = self._reduce(embeddings)
+        if precision == "int8":
+            scale = np.abs(reduced).max(axis=1, keepdims=True) / 127
+            scale[scale == 0] = 1
+            self.matrix = np.round(reduced / scale).astype(np.int8)
+            self.scale = scale[:, 0].astype(np.float32)
+        else:
+            self.matrix = reduced.astype(precision)
+            self.scale = None
+
+    def _reduce(self, vectors: np.ndarray) -> np.ndarray:
+        if self.projection is not None:
+            reduced = np.asarray(vectors, dtype=np.float32) @ self.projection
+        else:
+            reduced = np.array(vectors[..., :self.dims], dtype=np.float32)
+        norms = np.linalg.norm(reduced, axis=-1, keepdims=True)
+        np.divide(reduced, norms, out=reduced, where=norms > 0)
+        return reduced
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes + (self.scale.nbytes if self.scale is not None else 0)
+
+    def similarities(self, query: List[float], rows: np.ndarray) -> np.ndarray:
+        """Approximate cosine similarity of query against the given rows."""
+        q = self._reduce(np.asarray(query, dtype=np.float32))
+        scores = np.empty(len(rows), dtype=np.float32)
+        # Gather and widen a chunk at a time into reused buffers instead of
+        # copying every candidate row to float32 up front
+        chunk = min(len(rows), _SCORE_CHUNK_ROWS)
+        gathered = np.empty((chunk, self.matrix.shape[1]), dtype=self.matrix.dtype)
+        widened = gathered if self.matrix.dtype == np.float32 else np.empty(gathered.shape, dtype=np.float32)
+        for start in range(0, len(rows), _SCORE_CHUNK_ROWS):
+            block = rows[start:start + _SCORE_CHUNK_ROWS]
+            n = len(block)
+            np.take(self.matrix, block, axis=0, out=gathered[:n])
+            if widened is not gathered:
+                widened[:n] = gathered[:n]
+            np.dot(widened[:n], q, out=scores[start:start + n])
+        if self.scale is not None:
+            scores *= self.scale[rows]
+        return scores
@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime
 from app.models.user import UserPreferences
 from app.services.embedding_service import generate_user_embedding
-from app.utils.firebase_client import get_db
+from app.utils.firebase_client import cache_user, get_db
 
 def generate_user_id() -> str:
     return f"user_{uuid.uuid4().hex[:12]}"
@@ -27,6 +27,7 @@ def onboard_user(username: str, preferences: UserPreferences) -> dict:
     
     db = get_db()
     db.collection("users").document(user_id).set(user_data)
+    cache_user(user_id, user_data)
     
     return {
         "user_id": user_id,
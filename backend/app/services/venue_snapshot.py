@@ -0,0 +1,178 @@
+"""Versioned on-disk venue snapshots shared by every worker on a host.
+
+A snapshot directory holds one subdirectory per version plus a CURRENT file
+naming the live one:
+
+    <VENUE_SNAPSHOT_DIR>/
+        CURRENT                 -> "20260101T000000000000-1234"
+        20260101T000000000000-1234/
+            manifest.json       format, counts, timestamps, category vocabularies
+            embeddings.npy      float32 (count, dim), L2-normalized
+            lat.npy lon.npy price.npy rating.npy activity.npy category.npy
+            records.bin         display fields as concatenated JSON
+            offsets.npy         int64 (count + 1) offsets into records.bin
+            ids.json            venue ids in row order
+            ann_centroids.npy ann_assignments.npy   (only when an IVF index exists)
+
+Arrays are opened with mmap_mode="r", so N workers share one physical copy
+through the page cache. Versions are written to a temp directory, renamed,
+and published by atomically replacing CURRENT.
+"""
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+from app.services.ann_index import IVFIndex
+from app.services.venue_store import PackedRecords, VenueStore
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: no cross-process lock
+    fcntl = None
+
+SNAPSHOT_FORMAT = 1
+_CURRENT = "CURRENT"
+_LOCK = ".lock"
+_KEEP_VERSIONS = 2
+_COLUMNS = ("lat", "lon", "price", "rating", "activity", "category")
+
+
+@contextmanager
+def snapshot_lock(directory: str):
+    """Exclusive lock across processes, so only one worker rebuilds a snapshot at a time."""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, _LOCK), "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _current_version_dir(directory: str) -> Optional[str]:
+    try:
+        with open(os.path.join(directory, _CURRENT), encoding="utf-8") as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    path = os.path.join(directory, version)
+    return path if version and os.path.isdir(path) else None
+
+
+def read_manifest(directory: str) -> Optional[Dict[str, Any]]:
+    """Manifest of the live snapshot, or None if there is none (or its format is unknown)."""
+    path = _current_version_dir(directory)
+    if path is None:
+        return None
+    with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        return None
+    for key in ("fetched_at", "synced_to"):
+        if manifest.get(key):
+            manifest[key] = datetime.fromisoformat(manifest[key])
+    return manifest
+
+
+def write_snapshot(store: VenueStore, directory: str, fetched_at: datetime, synced_to: Optional[datetime]) -> str:
+    """Write store as a new snapshot version and make it current. Returns the version name."""
+    os.makedirs(directory, exist_ok=True)
+    version = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{os.getpid()}"
+    tmp = os.path.join(directory, f".{version}.tmp")
+    os.makedirs(tmp)
+
+    np.save(os.path.join(tmp, "embeddings.npy"), np.ascontiguousarray(store.embeddings, dtype=np.float32))
+    columns = {
+        "lat": store.lat,
+        "lon": store.lon,
+        "price": store.price,
+        "rating": store.rating,
+        "activity": store.activity_column,
+        "category": store.category_column,
+    }
+    for name, column in columns.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), column)
+
+    records = store.venues if isinstance(store.venues, PackedRecords) else PackedRecords.pack(store.venues)
+    with open(os.path.join(tmp, "records.bin"), "wb") as f:
+        f.write(records.blob)
+    np.save(os.path.join(tmp, "offsets.npy"), records.offsets)
+    with open(os.path.join(tmp, "ids.json"), "w", encoding="utf-8") as f:
+        json.dump(store.ids, f)
+
+    if store.ann is not None:
+        np.save(os.path.join(tmp, "ann_centroids.npy"), store.ann.centroids)
+        np.save(os.path.join(tmp, "ann_assignments.npy"), store.ann.assignments)
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": version,
+        "count": len(store),
+        "dim": store.dim,
+        "created_at": datetime.utcnow().isoformat(),
+        "fetched_at": fetched_at.isoformat(),
+        "synced_to": synced_to.isoformat() if synced_to else None,
+        "activity_codes": store.activity_codes,
+        "category_codes": store.category_codes,
+        "has_ann": store.ann is not None,
+    }
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+    os.rename(tmp, os.path.join(directory, version))
+    pointer = os.path.join(directory, f".{_CURRENT}.{os.getpid()}")
+    with open(pointer, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(directory, _CURRENT))
+
+    _prune(directory, keep=version)
+    return version
+
+
+def _prune(directory: str, keep: str) -> None:
+    """Remove all but the newest versions. Workers still mapping an old
+    version keep their pages; the files just lose their names."""
+    versions = sorted(
+        name for name in os.listdir(directory)
+        if not name.startswith(".") and name != _CURRENT and os.path.isdir(os.path.join(directory, name))
+    )
+    for name in versions[:-_KEEP_VERSIONS]:
+        if name != keep:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+def load_snapshot(directory: str) -> Optional[Tuple[VenueStore, Dict[str, Any]]]:
+    """Memory-map the live snapshot read-only. Returns (store, manifest) or None."""
+    manifest = read_manifest(directory)
+    if manifest is None:
+        return None
+    path = os.path.join(directory, manifest["version"])
+
+    # Zero-length files can't be mapped
+    mmap_mode = "r" if manifest["count"] else None
+
+    def _array(name: str) -> np.ndarray:
+        return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+
+    embeddings = _array("embeddings")
+    columns = {name: _array(name) for name in _COLUMNS}
+    if manifest["count"]:
+        blob = np.memmap(os.path.join(path, "records.bin"), dtype=np.uint8, mode="r")
+    else:
+        blob = b""
+    records = PackedRecords(blob, _array("offsets"))
+    with open(os.path.join(path, "ids.json"), encoding="utf-8") as f:
+        ids = json.load(f)
+
+    store = VenueStore.from_arrays(
+        records, ids, embeddings, columns,
+        manifest["activity_codes"], manifest["category_codes"],
+    )
+    if manifest["has_ann"]:
+        store.ann = IVFIndex.from_arrays(_array("ann_centroids"), _array("ann_assignments"))
+    return store, manifest
@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+from config import settings
+from app.utils.firebase_client import get_db
+
+_VENUES_PAGE_SIZE = 500
+
+
+def latest_update(venues: Iterable[Dict[str, Any]]) -> Optional[datetime]:
+    """Newest updated_at among venues, used as the watermark for the next delta query."""
+    stamps = [v["updated_at"] for v in venues if isinstance(v.get("updated_at"), datetime)]
+    return max(stamps) if stamps else None
+
+
+def _geohash_prefixes() -> List[str]:
+    prefixes = {p.strip() for p in settings.VENUE_GEOHASH_PREFIXES.split(",") if p.strip()}
+    # Drop prefixes already covered by a shorter one so no venue loads twice
+    return sorted(p for p in prefixes if not any(p != q and p.startswith(q) for q in prefixes))
+
+
+class FirestoreVenueSource:
+    """Reads the venues collection.
+
+    Venues carry an updated_at server timestamp (written by
+    generate_embeddings.py), so load_changes can fetch only documents
+    modified since the last sync. Deletions are soft: a document with
+    deleted=True is dropped by the store. Hard-deleted documents only
+    disappear on the next full load.
+    """
+
+    def _stream_pages(self, query, order_field: str = "__name__"):
+        """Yield every document of query, paging with start_after cursors."""
+        page_query = query.order_by(order_field).limit(_VENUES_PAGE_SIZE)
+        last_doc = None
+        while True:
+            page = page_query.start_after(last_doc) if last_doc else page_query
+            docs = list(page.stream())
+            yield from docs
+            if len(docs) < _VENUES_PAGE_SIZE:
+                return
+            last_doc = docs[-1]
+
+    def _partition_queries(self, collection, prefixes: List[str]) -> List[Any]:
+        if not prefixes:
+            return [collection]
+        return [
+            collection.where("geohash", ">=", prefix).where("geohash", "<", prefix + "~")
+            for prefix in prefixes
+        ]
+
+    def load_all(self) -> List[Dict[str, Any]]:
+        """Load the full venues collection, or only the configured geohash partitions."""
+        collection = get_db().collection("venues")
+        prefixes = _geohash_prefixes()
+
+        venues = []
+        for query in self._partition_queries(collection, prefixes):
+            for doc in self._stream_pages(query, order_field="geohash" if prefixes else "__name__"):
+                d = doc.to_dict()
+                if d.get("deleted"):
+                    continue
+                d["doc_id"] = doc.id
+                venues.append(d)
+        return venues
+
+    def load_changes(self, since: datetime) -> List[Dict[str, Any]]:
+        """Venues whose updated_at is newer than since, including soft-deleted ones."""
+        query = get_db().collection("venues").where("updated_at", ">", since)
+        prefixes = _geohash_prefixes()
+
+        changes = []
+        for doc in self._stream_pages(query, order_field="updated_at"):
+            d = doc.to_dict()
+            if prefixes and not any((d.get("geohash") or "").startswith(p) for p in prefixes):
+                continue
+            d["doc_id"] = doc.id
+            changes.append(d)
+        return changes
+
+
+class InMemoryVenueSource:
+    """Local stand-in for FirestoreVenueSource.
+
+    Keeps venue documents in a dict and stamps updated_at on every write, so
+    full loads and delta application can be exercised without Firestore.
+    """
+
+    def __init__(self, venues: Optional[Iterable[Dict[str, Any]]] = None):
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._last_stamp: Optional[datetime] = None
+        for venue in venues or []:
+            self.upsert(venue)
+
+    def _now(self) -> datetime:
+        now = datetime.now(timezone.utc)
+        # Keep stamps strictly increasing even when writes land in the same microsecond
+        if self._last_stamp is not None and now <= self._last_stamp:
+            now = self._last_stamp + timedelta(microseconds=1)
+        self._last_stamp = now
+        return now
+
+    def upsert(self, venue: Dict[str, Any]) -> None:
+        doc_id = venue.get("doc_id") or venue.get("place_id")
+        if not doc_id:
+            raise ValueError(f"Venue missing place_id: {venue.get('name')}")
+        doc = dict(venue)
+        doc["updated_at"] = self._now()
+        self._docs[doc_id] = doc
+
+    def delete(self, doc_id: str) -> None:
+        if doc_id in self._docs:
+            self._docs[doc_id] = {"deleted": True, "updated_at": self._now()}
+
+    def load_all(self) -> List[Dict[str, Any]]:
+        return [
+            {**doc, "doc_id": doc_id}
+            for doc_id, doc in self._docs.items()
+            if not doc.get("deleted")
+        ]
+
+    def load_changes(self, since: datetime) -> List[Dict[str, Any]]:
+        return [
+            {**doc, "doc_id": doc_id}
+            for doc_id, doc in self._docs.items()
+            if doc["updated_at"] > since
+        ]
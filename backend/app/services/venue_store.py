@@ -0,0 +1,418 @@
+import itertools
+import json
+import tempfile
+import numpy as np
+from collections import Counter
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from app.services.ann_index import IVFIndex
+from app.services.scoring_matrix import ScoringMatrix
+from app.utils.embedding_codec import EMBEDDING_BLOB_FIELD, document_embedding
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = EARTH_RADIUS_KM * np.pi / 180
+
+# Spatial grid cell size in degrees (~11 km of latitude), so a 20 km radius
+# query touches a handful of cells instead of every venue in the catalogue.
+GRID_CELL_DEGREES = 0.1
+
+# Every store gets a fresh version, so caches derived from one catalogue
+# snapshot can tell when the store they were computed from was replaced.
+_store_versions = itertools.count(1)
+
+
+def venue_coordinates(venue: Dict[str, Any]) -> Tuple[Optional[float], Optional[float]]:
+    location = venue.get("location", {})
+    lat = location.get("latitude") or location.get("lat")
+    lon = location.get("longitude") or location.get("lng")
+    return lat, lon
+
+
+def haversine_km(lat: float, lon: float, lat_rad: np.ndarray, lon_rad: np.ndarray, cos_lat: np.ndarray) -> np.ndarray:
+    """Vectorized haversine from one point to many points given in radians."""
+    lat1 = np.radians(lat)
+    lon1 = np.radians(lon)
+    a = np.sin((lat_rad - lat1) / 2) ** 2 + np.cos(lat1) * cos_lat * np.sin((lon_rad - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+class PackedRecords(Sequence):
+    """Venue display records packed as one JSON blob plus an offset table.
+
+    Record i is blob[offsets[i]:offsets[i + 1]] and is decoded only when read,
+    so the blob can be a memory-mapped file shared between worker processes.
+    Timestamps come back as ISO strings.
+    """
+
+    def __init__(self, blob, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def pack(cls, venues: Iterable[Dict[str, Any]],
+             exclude: Tuple[str, ...] = ("embedding", EMBEDDING_BLOB_FIELD)) -> "PackedRecords":
+        chunks = [
+            json.dumps(
+                {k: v for k, v in venue.items() if k not in exclude},
+                default=_json_default,
+                ensure_ascii=False,
+                separators=(",", ":"),
+            ).encode("utf-8")
+            for venue in venues
+        ]
+        offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+        np.cumsum([len(chunk) for chunk in chunks], out=offsets[1:])
+        return cls(b"".join(chunks), offsets)
+
+    def take(self, rows: np.ndarray) -> "PackedRecords":
+        """New PackedRecords holding the given rows, copied as raw bytes."""
+        starts = self.offsets[rows]
+        stops = self.offsets[np.asarray(rows) + 1]
+        blob = b"".join(bytes(self.blob[start:stop]) for start, stop in zip(starts, stops))
+        offsets = np.zeros(len(starts) + 1, dtype=np.int64)
+        np.cumsum(stops - starts, out=offsets[1:])
+        return PackedRecords(blob, offsets)
+
+    def extend(self, other: "PackedRecords") -> "PackedRecords":
+        offsets = np.concatenate([self.offsets, other.offsets[1:] + self.offsets[-1]])
+        return PackedRecords(bytes(self.blob) + bytes(other.blob), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        start, stop = int(self.offsets[index]), int(self.offsets[index + 1])
+        return json.loads(bytes(self.blob[start:stop]))
+
+
+def venue_id(venue: Dict[str, Any]) -> Optional[str]:
+    return venue.get("doc_id") or venue.get("place_id")
+
+
+def _embedding_dim(venues: List[Dict[str, Any]]) -> int:
+    """Most common embedding length, so a few venues embedded with another model can't set it."""
+    lengths = Counter()
+    for venue in venues:
+        embedding = document_embedding(venue)
+        if embedding is not None and len(embedding):
+            lengths[len(embedding)] += 1
+    return lengths.most_common(1)[0][0] if lengths else 0
+
+
+def _scorable(venue: Dict[str, Any], dim: int) -> bool:
+    embedding = document_embedding(venue)
+    if embedding is None or not dim or len(embedding) != dim:
+        return False
+    lat, lon = venue_coordinates(venue)
+    return bool(lat and lon)
+
+
+def _scorable_rows(venues: List[Dict[str, Any]], dim: int) -> List[Dict[str, Any]]:
+    """Venues the store can hold, reporting the rest so bad embeddings don't go unnoticed."""
+    rows = []
+    wrong_dim = []
+    unscorable = 0
+    for venue in venues:
+        if _scorable(venue, dim):
+            rows.append(venue)
+            continue
+        embedding = document_embedding(venue)
+        if embedding is not None and len(embedding) and len(embedding) != dim:
+            wrong_dim.append(venue_id(venue))
+        else:
+            unscorable += 1
+    if wrong_dim:
+        print(f"[venues] Skipped {len(wrong_dim)} venues whose embedding is not {dim}-dimensional: "
+              f"{', '.join(str(vid) for vid in wrong_dim[:10])}{' ...' if len(wrong_dim) > 10 else ''}")
+    if unscorable:
+        print(f"[venues] Skipped {unscorable} venues without an embedding or coordinates")
+    return rows
+
+
+def _normalized_embeddings(venues: List[Dict[str, Any]], dim: int) -> np.ndarray:
+    embeddings = np.empty((len(venues), dim), dtype=np.float32)
+    for i, venue in enumerate(venues):
+        embeddings[i] = document_embedding(venue)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    np.divide(embeddings, norms, out=embeddings, where=norms > 0)
+    return embeddings
+
+
+def _encode_field(values: List[Optional[str]]) -> Tuple[Dict[str, int], np.ndarray]:
+    """Map a categorical field to (value -> code, per-row code column); missing is -1."""
+    codes: Dict[str, int] = {}
+    for value in values:
+        if value is not None and value not in codes:
+            codes[value] = len(codes)
+    return codes, np.array([codes.get(value, -1) for value in values], dtype=np.int16)
+
+
+def _extend_field(
+    codes: Dict[str, int], column: np.ndarray, values: List[Optional[str]]
+) -> Tuple[Dict[str, int], np.ndarray]:
+    """Append rows to an encoded field, growing the vocabulary for unseen values."""
+    codes = dict(codes)
+    for value in values:
+        if value is not None and value not in codes:
+            codes[value] = len(codes)
+    added = np.array([codes.get(value, -1) for value in values], dtype=np.int16)
+    return codes, np.concatenate([column, added])
+
+
+def _postings(codes: Dict[str, int], column: np.ndarray) -> Dict[str, np.ndarray]:
+    return {value: np.flatnonzero(column == code) for value, code in codes.items()}
+
+
+def _hot_columns(venues: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    coordinates = [venue_coordinates(venue) for venue in venues]
+    return {
+        "lat": np.array([lat for lat, _ in coordinates], dtype=np.float64),
+        "lon": np.array([lon for _, lon in coordinates], dtype=np.float64),
+        "price": np.array([venue.get("price_level") or 0 for venue in venues], dtype=np.int16),
+        "rating": np.array([venue.get("rating") or 0 for venue in venues], dtype=np.float64),
+    }
+
+
+class VenueStore:
+    """Columnar view of the venue catalogue, built once per cache load.
+
+    Only venues the recommender can ever score are kept (embedding present and
+    matching the most common dimension, non-zero coordinates). Row i of every
+    array describes venues[i]. Embeddings are L2-normalized float32 so cosine
+    similarity against a whole bucket is a single matrix-vector product.
+
+    Hot fields used for scoring live only in typed arrays. Everything else
+    (names, opening hours, tags...) is packed into PackedRecords and decoded
+    only for the rows a request actually returns; no per-venue dicts or
+    embedding float lists are retained.
+    """
+
+    def __init__(self, venues: List[Dict[str, Any]]):
+        dim = _embedding_dim(venues)
+        rows = _scorable_rows(venues, dim)
+        columns = _hot_columns(rows)
+        activity_codes, columns["activity"] = _encode_field([venue.get("activity") for venue in rows])
+        category_codes, columns["category"] = _encode_field([venue.get("category") for venue in rows])
+        self._set_columns(
+            PackedRecords.pack(rows),
+            [venue_id(venue) for venue in rows],
+            _normalized_embeddings(rows, dim),
+            columns,
+            activity_codes,
+            category_codes,
+        )
+
+    @classmethod
+    def from_arrays(
+        cls,
+        venues: Sequence[Dict[str, Any]],
+        ids: List[str],
+        embeddings: np.ndarray,
+        columns: Dict[str, np.ndarray],
+        activity_codes: Dict[str, int],
+        category_codes: Dict[str, int],
+    ) -> "VenueStore":
+        """Build a store from precomputed columns (e.g. a memory-mapped snapshot).
+
+        columns holds lat, lon, price, rating, activity and category arrays;
+        nothing is re-derived from the venue records, so venues may be a lazy
+        sequence.
+        """
+        store = cls.__new__(cls)
+        store._set_columns(venues, ids, embeddings, columns, activity_codes, category_codes)
+        return store
+
+    def _set_columns(
+        self,
+        venues: Sequence[Dict[str, Any]],
+        ids: List[str],
+        embeddings: np.ndarray,
+        columns: Dict[str, np.ndarray],
+        activity_codes: Dict[str, int],
+        category_codes: Dict[str, int],
+    ) -> None:
+        self.version = next(_store_versions)
+        self.venues = venues
+        self.ids = ids
+        self.dim = embeddings.shape[1]
+        self.embeddings = embeddings
+
+        self.lat = columns["lat"]
+        self.lon = columns["lon"]
+        self.lat_rad = np.radians(self.lat)
+        self.lon_rad = np.radians(self.lon)
+        self.cos_lat = np.cos(self.lat_rad)
+        self.price = columns["price"]
+        self.rating = columns["rating"]
+        self.ann: Optional[IVFIndex] = None
+        self.scoring: Optional[ScoringMatrix] = None
+        self._build_grid()
+
+        # Activity and category are small closed vocabularies, so rows carry a
+        # code per field; activity, the one scoring filters on, also gets a
+        # sorted posting list per value.
+        self.activity_codes = activity_codes
+        self.activity_column = columns["activity"]
+        self.activity_rows = _postings(activity_codes, self.activity_column)
+        self.category_codes = category_codes
+        self.category_column = columns["category"]
+
+    def apply_changes(self, changed: List[Dict[str, Any]]) -> "VenueStore":
+        """Return a new store with changed venues upserted.
+
+        Venues that are soft-deleted or no longer scorable are removed.
+        Unchanged rows are copied as arrays and packed bytes rather than
+        re-decoded, and an existing ANN index keeps its centroids, so only the
+        changed rows are assigned to lists. The current store is left
+        untouched for readers still holding it.
+        """
+        if not self.dim:
+            merged = {vid: venue for vid, venue in zip(self.ids, self.venues)}
+            for venue in changed:
+                merged[venue_id(venue)] = venue
+            return VenueStore([v for v in merged.values() if not v.get("deleted")])
+
+        latest = {venue_id(venue): venue for venue in changed}
+        keep = np.array([row for row, vid in enumerate(self.ids) if vid not in latest], dtype=np.intp)
+        added = _scorable_rows([v for v in latest.values() if not v.get("deleted")], self.dim)
+
+        added_columns = _hot_columns(added)
+        columns = {
+            name: np.concatenate([getattr(self, name)[keep], added_columns[name]])
+            for name in ("lat", "lon", "price", "rating")
+        }
+        activity_codes, columns["activity"] = _extend_field(
+            self.activity_codes, self.activity_column[keep], [v.get("activity") for v in added]
+        )
+        category_codes, columns["category"] = _extend_field(
+            self.category_codes, self.category_column[keep], [v.get("category") for v in added]
+        )
+
+        added_embeddings = _normalized_embeddings(added, self.dim)
+        store = VenueStore.from_arrays(
+            self.venues.take(keep).extend(PackedRecords.pack(added)),
+            [self.ids[row] for row in keep] + [venue_id(v) for v in added],
+            np.concatenate([self.embeddings[keep], added_embeddings]),
+            columns,
+            activity_codes,
+            category_codes,
+        )
+        if self.ann is not None:
+            store.ann = self.ann.with_rows(self.ann.assignments[keep], added_embeddings)
+        return store
+
+    def rows_for_activity(self, rows: np.ndarray, activity: str) -> np.ndarray:
+        """The subset of sorted rows that belong to activity ("any" keeps them all)."""
+        if not activity or activity == "any":
+            return rows
+        postings = self.activity_rows.get(activity)
+        if postings is None:
+            return rows[:0]
+        return np.intersect1d(rows, postings, assume_unique=True)
+
+    def build_ann_index(self, n_lists: Optional[int] = None) -> None:
+        """Cluster the embedding matrix into an IVF index used for candidate generation."""
+        if len(self):
+            self.ann = IVFIndex(self.embeddings, n_lists=n_lists)
+
+    def build_scoring_matrix(self, precision: str, dims: int = 0, reduction: str = "truncate") -> None:
+        """Build the reduced-precision matrix used for first-pass similarity."""
+        if len(self):
+            self.scoring = ScoringMatrix(self.embeddings, precision=precision, dims=dims, reduction=reduction)
+
+    def spill_embeddings(self) -> None:
+        """Move the full-precision matrix to an unlinked temporary file, mapped read-only.
+
+        With a scoring matrix only the re-ranked shortlist is read from the
+        full matrix, so its pages can be file-backed and reclaimed instead of
+        staying resident. Stores mapped from a snapshot already are.
+        """
+        if isinstance(self.embeddings, np.memmap) or not self.embeddings.size:
+            return
+        with tempfile.TemporaryFile(prefix="venue-embeddings-") as f:
+            np.ascontiguousarray(self.embeddings, dtype=np.float32).tofile(f)
+            f.flush()
+            # The mapping keeps its own handle, so closing the file is fine
+            self.embeddings = np.memmap(f, dtype=np.float32, mode="r", shape=self.embeddings.shape)
+
+    def _build_grid(self) -> None:
+        """Bucket rows into lat/lon grid cells.
+
+        Rows are sorted by cell so each cell is a contiguous slice of
+        _grid_rows; _grid_slices maps (lat_cell, lon_cell) -> (start, stop).
+        """
+        cell_lat = np.floor(self.lat / GRID_CELL_DEGREES).astype(np.int64)
+        cell_lon = np.floor(self.lon / GRID_CELL_DEGREES).astype(np.int64)
+        order = np.lexsort((cell_lon, cell_lat))
+        self._grid_rows = order
+        self._grid_slices: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        if not len(order):
+            return
+        keys = np.stack([cell_lat[order], cell_lon[order]], axis=1)
+        boundaries = np.flatnonzero(np.any(keys[1:] != keys[:-1], axis=1)) + 1
+        starts = np.concatenate([[0], boundaries])
+        stops = np.concatenate([boundaries, [len(order)]])
+        for start, stop in zip(starts, stops):
+            key = (int(keys[start, 0]), int(keys[start, 1]))
+            self._grid_slices[key] = (int(start), int(stop))
+
+    def __len__(self) -> int:
+        return len(self.venues)
+
+    def rows_near(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """Rows whose grid cell overlaps the bounding box of the radius, in row order.
+
+        This is a superset of the rows within radius_km; callers still apply
+        exact haversine to the result.
+        """
+        dlat = radius_km / KM_PER_DEGREE
+        max_lat = abs(lat) + dlat
+        if max_lat >= 90:
+            # The circle contains a pole, so it spans every longitude
+            return np.arange(len(self))
+        dlon = radius_km / (KM_PER_DEGREE * np.cos(np.radians(max_lat)))
+        if dlon >= 180 or abs(lon) + dlon >= 180:
+            # Box wraps the antimeridian; not worth special-casing
+            return np.arange(len(self))
+
+        lat0, lat1 = int(np.floor((lat - dlat) / GRID_CELL_DEGREES)), int(np.floor((lat + dlat) / GRID_CELL_DEGREES))
+        lon0, lon1 = int(np.floor((lon - dlon) / GRID_CELL_DEGREES)), int(np.floor((lon + dlon) / GRID_CELL_DEGREES))
+
+        if (lat1 - lat0 + 1) * (lon1 - lon0 + 1) > len(self._grid_slices):
+            keys = [k for k in self._grid_slices if lat0 <= k[0] <= lat1 and lon0 <= k[1] <= lon1]
+        else:
+            keys = [(i, j) for i in range(lat0, lat1 + 1) for j in range(lon0, lon1 + 1)]
+
+        slices = [self._grid_slices[k] for k in keys if k in self._grid_slices]
+        if not slices:
+            return np.empty(0, dtype=np.intp)
+        rows = np.concatenate([self._grid_rows[start:stop] for start, stop in slices])
+        rows.sort()
+        return rows
+
+    def distances_from(self, lat: float, lon: float, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        if rows is None:
+            return haversine_km(lat, lon, self.lat_rad, self.lon_rad, self.cos_lat)
+        return haversine_km(lat, lon, self.lat_rad[rows], self.lon_rad[rows], self.cos_lat[rows])
+
+    def similarities(self, query: List[float], rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Cosine similarity of query against the given rows (all rows by default).
+
+        A zero query scores 0.0 everywhere.
+        """
+        embeddings = self.embeddings if rows is None else self.embeddings[rows]
+        q = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        if norm == 0:
+            return np.zeros(len(embeddings), dtype=np.float32)
+        return embeddings @ (q / norm)
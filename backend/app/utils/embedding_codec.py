@@ -0,0 +1,52 @@
+import struct
+import numpy as np
+from typing import Any, Dict, Optional, Sequence
+
+# Firestore field holding the packed embedding. The legacy list-of-doubles
+# field is "embedding"; readers accept either.
+EMBEDDING_BLOB_FIELD = "embedding_f32"
+
+# Header: magic, format version, dtype code, dimension (little-endian)
+_HEADER = struct.Struct("<2sBBI")
+_MAGIC = b"NE"
+_VERSION = 1
+_DTYPE_FLOAT32 = 1
+
+
+def encode_embedding(vector: Sequence[float]) -> bytes:
+    """Pack an embedding as an L2-normalized little-endian float32 blob with header."""
+    array = np.asarray(vector, dtype="<f4")
+    norm = np.linalg.norm(array)
+    if norm > 0:
+        array = array / norm
+    return _HEADER.pack(_MAGIC, _VERSION, _DTYPE_FLOAT32, len(array)) + array.astype("<f4").tobytes()
+
+
+def decode_embedding(blob: bytes) -> np.ndarray:
+    """Zero-copy read-only view of a packed embedding."""
+    if len(blob) < _HEADER.size:
+        raise ValueError(f"Embedding blob of {len(blob)} bytes is shorter than its header")
+    magic, version, dtype, dim = _HEADER.unpack_from(blob)
+    if magic != _MAGIC or version != _VERSION or dtype != _DTYPE_FLOAT32:
+        raise ValueError(f"Unsupported embedding blob (magic={magic!r}, version={version}, dtype={dtype})")
+    if len(blob) != _HEADER.size + 4 * dim:
+        raise ValueError(f"Embedding blob length {len(blob)} does not match dimension {dim}")
+    return np.frombuffer(blob, dtype="<f4", count=dim, offset=_HEADER.size)
+
+
+def document_embedding(doc: Dict[str, Any]) -> Optional[Sequence[float]]:
+    """Embedding of a Firestore document, from the packed blob if present, else the legacy list."""
+    blob = doc.get(EMBEDDING_BLOB_FIELD)
+    if blob:
+        return decode_embedding(bytes(blob))
+    return doc.get("embedding")
+
+
+def without_embeddings(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop both embedding fields in place before a venue is returned to clients.
+
+    Embeddings are for scoring only, and the blob isn't JSON-serializable.
+    """
+    doc.pop("embedding", None)
+    doc.pop(EMBEDDING_BLOB_FIELD, None)
+    return doc
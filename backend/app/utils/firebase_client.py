@@ -1,6 +1,7 @@
 from __future__ import annotations
 from typing import Any, Optional
 from config import settings
+from app.utils.ttl_cache import TTLCache
 
 import json
 import base64
@@ -11,6 +12,11 @@ from firebase_admin import credentials, firestore
 
 _db: Optional[firestore.Client] = None
 
+# User documents by id, plus ids known not to exist. Kept current by write-through
+# from this process (cache_user / save_user); see USER_CACHE_* settings.
+_user_cache = TTLCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL_SECONDS)
+_missing_users = TTLCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_MISSING_TTL_SECONDS)
+
 def initialize_firebase() -> firestore.Client:
     global _db
     
@@ -76,12 +82,46 @@ def get_db() -> firestore.Client:
     return _db
 
 def get_user(user_id: str) -> Optional[dict[str, Any]]:
+    """User document, served from the in-process cache when possible.
+
+    Returns a shallow copy; nested values are shared with the cache and must
+    not be mutated.
+    """
+    cached = _user_cache.get(user_id)
+    if cached is not None:
+        return dict(cached)
+    if _missing_users.get(user_id):
+        return None
+
+    generation = _user_cache.invalidations
     db = get_db()
     snap = db.collection("users").document(user_id).get()
-    return snap.to_dict() if snap.exists else None
+    if not snap.exists:
+        _missing_users.set(user_id, True)
+        return None
+    data = snap.to_dict()
+    # Skipped if this user was written or invalidated while we were reading
+    _user_cache.set(user_id, data, generation=generation)
+    return dict(data)
+
+def cache_user(user_id: str, data: dict[str, Any]) -> None:
+    """Write-through: record the user document as just written to Firestore."""
+    _missing_users.discard(user_id)
+    _user_cache.discard(user_id)
+    _user_cache.set(user_id, dict(data))
+
+def invalidate_user(user_id: str) -> None:
+    """Drop the cached user after a partial write; the next get_user re-reads it.
+
+    Merging the change into the cached copy could keep fields that are stale
+    by then, so only complete documents go through cache_user.
+    """
+    _missing_users.discard(user_id)
+    _user_cache.discard(user_id)
 
 def save_user(user_id: str, data: dict[str, Any]) -> None:
     if not isinstance(data, dict):
         raise ValueError("save_user: 'data' must be a dict")
     db = get_db()
     db.collection("users").document(user_id).set(data, merge=True)
+    invalidate_user(user_id)
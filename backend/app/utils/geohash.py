@@ -0,0 +1,42 @@
+from typing import Optional
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# 7 characters is ~150 m; plenty for prefix partitioning (4 chars ~ 20-40 km)
+GEOHASH_PRECISION = 7
+
+
+def encode_geohash(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+
+def venue_geohash(venue: dict) -> Optional[str]:
+    location = venue.get("location") or {}
+    lat = location.get("latitude") or location.get("lat")
+    lon = location.get("longitude") or location.get("lng")
+    if lat is None or lon is None:
+        return None
+    return encode_geohash(lat, lon)
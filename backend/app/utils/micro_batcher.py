@@ -0,0 +1,90 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, List
+
+
+class MicroBatcher:
+    """Group concurrent single-item calls into batched calls.
+
+    submit() enqueues an item and blocks until its result is ready. A worker
+    thread takes the first waiting item, keeps collecting for up to
+    max_wait_ms or until max_batch_size items are queued, then hands
+    batch_fn(items), which must return one result per item in order, to
+    one of max_in_flight batch threads. If batch_fn raises, every caller in
+    that batch gets the exception.
+
+    Up to max_in_flight batches run at once, so one slow call only holds up
+    its own batch. While every slot is busy, new items keep queueing and go
+    out together once a slot frees up. batch_fn should bound its own run
+    time (e.g. a client timeout): a call that never returns keeps its slot.
+    Batches get their own threads rather than the shared blocking pool,
+    because callers usually wait in submit() on that pool's threads.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], max_batch_size: int = 64,
+                 max_wait_ms: float = 5.0, max_in_flight: int = 4, name: str = "micro-batcher"):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.max_in_flight = max(1, max_in_flight)
+        self.name = name
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix=f"{name}-batch")
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def submit(self, item: Any) -> Any:
+        future: Future = Future()
+        self._queue.put((item, future))
+        self._ensure_worker()
+        return future.result()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> List[tuple]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            # Wait for a free slot first, so items arriving meanwhile join this batch
+            self._slots.acquire()
+            batch = self._collect()
+            try:
+                self._executor.submit(self._execute, batch)
+            except Exception as e:
+                self._slots.release()
+                for _, future in batch:
+                    future.set_exception(e)
+
+    def _execute(self, batch: List[tuple]) -> None:
+        try:
+            items = [item for item, _ in batch]
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"{self.name}: batch returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                return
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+        finally:
+            self._slots.release()
@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after ttl_seconds.
+
+    ttl_seconds=None keeps entries until they are evicted. max_entries <= 0
+    disables the cache: get always misses and set is a no-op.
+    `invalidations` counts discard/clear calls; pass the value read before a
+    computation to set() so a result is not stored if its key (or its group)
+    was discarded, or the cache was cleared, in the meantime. Discarding one
+    key or group does not hold back fills of other keys.
+    group, if given, maps a key to the group discard_group() drops it with
+    (e.g. every entry of one user).
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: Optional[float],
+                 group: Optional[Callable[[Hashable], Hashable]] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.group = group
+        self.invalidations = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # Counter value at each key's or group's last discard, oldest first;
+        # bounded like the entries, with _forgotten_at covering those dropped
+        self._discarded_at: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._group_discarded_at: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._forgotten_at = 0
+        self._all_discarded_at = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation < max(
+                self._all_discarded_at,
+                self._forgotten_at,
+                self._discarded_at.get(key, 0),
+                self._group_discarded_at.get(self.group(key), 0) if self.group else 0,
+            ):
+                return
+            expires_at = float("inf") if self.ttl_seconds is None else time.monotonic() + self.ttl_seconds
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _stamp(self, stamps: "OrderedDict[Hashable, int]", key: Hashable) -> None:
+        """Record a discard of key in stamps. Caller holds the lock."""
+        self.invalidations += 1
+        stamps[key] = self.invalidations
+        stamps.move_to_end(key)
+        while len(stamps) > max(self.max_entries, 1):
+            _, forgotten = stamps.popitem(last=False)
+            self._forgotten_at = max(self._forgotten_at, forgotten)
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._stamp(self._discarded_at, key)
+            self._entries.pop(key, None)
+
+    def discard_group(self, group: Hashable) -> int:
+        """Drop every entry in group. Returns how many were dropped."""
+        if self.group is None:
+            raise ValueError("discard_group needs a cache created with group=")
+        with self._lock:
+            self._stamp(self._group_discarded_at, group)
+            stale = [key for key in self._entries if self.group(key) == group]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.invalidations += 1
+            self._all_discarded_at = self.invalidations
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -2,8 +2,10 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import Optional
 
 class Settings(BaseSettings):
-    OPENAI_API_KEY: str
-    GOOGLE_PLACES_API_KEY: str
+    # Only needed by the features that call these APIs (embedding provider
+    # "openai", venue setup and insight scripts)
+    OPENAI_API_KEY: Optional[str] = None
+    GOOGLE_PLACES_API_KEY: Optional[str] = None
     
     FIREBASE_CREDENTIALS_PATH: str = "./firebase-service-account.json"
     FIREBASE_CREDENTIALS_BASE64: Optional[str] = None
@@ -11,6 +13,121 @@ class Settings(BaseSettings):
     ENVIRONMENT: str = "development"
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8000
+
+    # Comma-separated geohash prefixes this instance serves (e.g. "xn7,xn76").
+    # Empty loads the whole venues collection.
+    VENUE_GEOHASH_PREFIXES: str = ""
+
+    # Seconds between incremental venue refreshes (documents whose updated_at
+    # moved since the last sync). 0 disables; the full reload still runs daily.
+    VENUE_DELTA_REFRESH_SECONDS: int = 0
+
+    # Directory for the memory-mapped venue snapshot shared by all uvicorn
+    # workers on a host. Empty keeps a private in-process store per worker.
+    VENUE_SNAPSHOT_DIR: str = ""
+
+    # Approximate nearest-neighbour candidate generation for recommendations.
+    # Only used once a bucket holds VENUE_ANN_MIN_VENUES venues; below that the
+    # exact scan is already cheap. VENUE_ANN_LISTS=0 picks sqrt(venue count).
+    VENUE_ANN_ENABLED: bool = False
+    VENUE_ANN_MIN_VENUES: int = 20000
+    VENUE_ANN_LISTS: int = 0
+    VENUE_ANN_NPROBE: int = 16
+
+    # First-pass scoring precision: float32 (exact) or int8, with optional
+    # dimension reduction (0 = full, "truncate" or "pca"). When reduced, the
+    # top VENUE_RERANK_CANDIDATES are re-scored at full precision, read from a
+    # memory-mapped copy of the full matrix (the snapshot, or a file under
+    # TMPDIR) so it does not stay resident next to the reduced one.
+    VENUE_SCORING_PRECISION: str = "float32"
+    VENUE_SCORING_DIMS: int = 0
+    VENUE_SCORING_REDUCTION: str = "truncate"
+    VENUE_RERANK_CANDIDATES: int = 200
+
+    # Recommendation result cache, keyed by user, activity, location cell
+    # (RECOMMENDATION_CACHE_CELL_DEGREES, ~200 m), session preferences and
+    # limit. Entries are dropped when the user's preferences change and
+    # bypassed once the venue store is refreshed. 0 entries disables it.
+    RECOMMENDATION_CACHE_SIZE: int = 4096
+    RECOMMENDATION_CACHE_TTL_SECONDS: int = 300
+    RECOMMENDATION_CACHE_CELL_DEGREES: float = 0.002
+
+    # In-process user profile cache. Writes made through this instance replace
+    # (new profiles) or drop (partial updates) the cached entry; changes from
+    # other instances show up within the TTL.
+    # Unknown user ids are remembered for USER_CACHE_MISSING_TTL_SECONDS.
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: int = 300
+    USER_CACHE_MISSING_TTL_SECONDS: int = 30
+
+    # Where text embeddings come from: "openai" (text-embedding-3-small) or
+    # "hashing", a deterministic local provider of hashed word/trigram vectors
+    # for offline load tests and profiling. Its vectors aren't comparable
+    # with OpenAI venue embeddings, so use it with matching venue data.
+    EMBEDDING_PROVIDER: str = "openai"
+    EMBEDDING_HASHING_DIM: int = 1536
+
+    # Embedding cache keyed by model and canonical text. With a path, a SQLite
+    # file shared by all workers on the host that survives restarts; empty
+    # keeps a per-process in-memory cache. At most EMBEDDING_CACHE_SIZE entries.
+    EMBEDDING_CACHE_PATH: str = ""
+    EMBEDDING_CACHE_SIZE: int = 10000
+
+    # Embedding requests arriving within EMBEDDING_BATCH_WAIT_MS of each other
+    # are sent as one API call of up to EMBEDDING_BATCH_MAX_SIZE inputs.
+    # A max size of 1 sends every request on its own. Up to
+    # EMBEDDING_BATCH_MAX_IN_FLIGHT batches are sent concurrently.
+    EMBEDDING_BATCH_MAX_SIZE: int = 64
+    EMBEDDING_BATCH_WAIT_MS: float = 5.0
+    EMBEDDING_BATCH_MAX_IN_FLIGHT: int = 4
+
+    # Per-attempt timeout for OpenAI embedding calls; every request waiting
+    # on a timed-out batch fails with the timeout error.
+    EMBEDDING_REQUEST_TIMEOUT_SECONDS: float = 10.0
+
+    # Precomputed preference vocabulary (scripts/build_embedding_vocabulary.py).
+    # When set, known dietary/vibe/mood combinations are embedded locally and
+    # only unknown free text reaches the API. Empty disables.
+    EMBEDDING_VOCABULARY_PATH: str = ""
+
+    # Analytics event-id deduplication window. With ANALYTICS_DEDUP_PATH, ids
+    # live in a SQLite file shared by all workers on the host; otherwise each
+    # process keeps at most ANALYTICS_DEDUP_MAX_IDS ids in memory.
+    ANALYTICS_DEDUP_WINDOW_SECONDS: int = 60
+    ANALYTICS_DEDUP_MAX_IDS: int = 200000
+    ANALYTICS_DEDUP_PATH: str = ""
+
+    # Write-behind for analytics events: requests are acknowledged once queued
+    # and a background thread commits up to 500 events per Firestore batch,
+    # every ANALYTICS_FLUSH_INTERVAL_MS or as soon as a batch is full. Beyond
+    # ANALYTICS_MAX_PENDING_EVENTS queued events the endpoint answers 503.
+    ANALYTICS_WRITE_BEHIND: bool = True
+    ANALYTICS_FLUSH_INTERVAL_MS: int = 1000
+    ANALYTICS_MAX_PENDING_EVENTS: int = 50000
+
+    # Local append-only copy of accepted analytics events for ML exports.
+    # Segments roll at ANALYTICS_EVENT_LOG_SEGMENT_MB or after
+    # ANALYTICS_EVENT_LOG_SEGMENT_MINUTES and are fsynced every
+    # ANALYTICS_EVENT_LOG_FSYNC_MS; scripts/compact_event_log.py turns closed
+    # segments into columnar files. Empty disables the log.
+    ANALYTICS_EVENT_LOG_DIR: str = ""
+    ANALYTICS_EVENT_LOG_SEGMENT_MB: int = 64
+    ANALYTICS_EVENT_LOG_SEGMENT_MINUTES: int = 10
+    ANALYTICS_EVENT_LOG_FSYNC_MS: int = 1000
+
+    # Largest (decompressed) NDJSON upload accepted by /api/analytics/events/stream
+    ANALYTICS_STREAM_MAX_MB: int = 64
+
+    # Server-side freeze detection over ingested events (per process). At most
+    # FREEZE_ENGINE_MAX_SESSIONS sessions are tracked; a session is dropped
+    # after FREEZE_ENGINE_SESSION_IDLE_MINUTES without events.
+    FREEZE_ENGINE_ENABLED: bool = True
+    FREEZE_ENGINE_MAX_SESSIONS: int = 50000
+    FREEZE_ENGINE_SESSION_IDLE_MINUTES: int = 30
+
+    # Threads shared by all requests for blocking Firestore/OpenAI calls made
+    # from async routes. Extra calls wait for a free thread.
+    BLOCKING_IO_WORKERS: int = 32
     
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -0,0 +1,56 @@
+from google.cloud.firestore_v1 import FieldPath
+from app.utils.firebase_client import initialize_firebase, get_db
+from app.utils.geohash import venue_geohash
+
+
+def backfill_geohash(page_size: int = 500):
+    initialize_firebase()
+    db = get_db()
+    
+    print("Scanning venues for missing geohash...")
+    query = db.collection("venues") \
+        .select(["location", "geohash"]) \
+        .order_by(FieldPath.document_id()) \
+        .limit(page_size)
+    
+    updated = 0
+    skipped = 0
+    last_doc = None
+    
+    while True:
+        page = query.start_after(last_doc) if last_doc else query
+        docs = list(page.stream())
+        
+        batch = db.batch()
+        pending = 0
+        for doc in docs:
+            data = doc.to_dict()
+            geohash = venue_geohash(data)
+            if not geohash:
+                skipped += 1
+                continue
+            if data.get("geohash") == geohash:
+                continue
+            batch.update(doc.reference, {"geohash": geohash})
+            pending += 1
+        
+        if pending:
+            batch.commit()
+            updated += pending
+            print(f"  Updated {updated} venues...")
+        
+        if len(docs) < page_size:
+            break
+        last_doc = docs[-1]
+    
+    print(f"\nTotal updated: {updated} venues")
+    if skipped:
+        print(f"Skipped {skipped} venues without coordinates")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("BACKFILL VENUE GEOHASH")
+    print("=" * 60)
+    print()
+    backfill_geohash()
@@ -0,0 +1,94 @@
+"""Compare IVF candidate generation against the exact recommendation path.
+
+Builds a synthetic catalogue of clustered embeddings around Tokyo, then for
+each n_probe value reports recall@k of the final ranking (after the
+distance/rating/budget blend) and mean latency versus the exact scan.
+
+Usage (from backend/):
+    python -m scripts.benchmark_ann --venues 100000 --dim 1536 --k 12
+"""
+import argparse
+import time
+import numpy as np
+from app.services.recommendation_engine import score_venues, top_k_indices
+from app.services.venue_store import VenueStore
+
+TOKYO = (35.68, 139.76)
+# Within-topic spread; high enough that topics overlap like real embeddings do
+NOISE = 2.0
+
+
+def make_venues(n: int, dim: int, topics: int, seed: int) -> list:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((topics, dim)).astype(np.float32)
+    labels = rng.integers(0, topics, n)
+    embeddings = centers[labels] + NOISE * rng.standard_normal((n, dim)).astype(np.float32)
+    lats = TOKYO[0] + rng.uniform(-0.15, 0.15, n)
+    lons = TOKYO[1] + rng.uniform(-0.15, 0.15, n)
+    ratings = rng.choice([3.5, 4.0, 4.2, 4.5, 4.8], n)
+    prices = rng.integers(0, 5, n)
+    return [
+        {
+            "place_id": f"venue_{i}",
+            "location": {"latitude": float(lats[i]), "longitude": float(lons[i])},
+            "rating": float(ratings[i]),
+            "price_level": int(prices[i]),
+            "embedding": embeddings[i],
+        }
+        for i in range(n)
+    ], centers
+
+
+def rank(store, query, lat, lon, k, n_probe=None):
+    rows, _, _, scores = score_venues(store, query, lat, lon, 3, 30.0, n_probe=n_probe)
+    return rows[top_k_indices(np.round(scores, 4), k)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--venues", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=12)
+    parser.add_argument("--lists", type=int, default=0, help="0 = sqrt(venues)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32, 64])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"Building {args.venues} venues x {args.dim} dims...")
+    venues, centers = make_venues(args.venues, args.dim, args.topics, args.seed)
+    store = VenueStore(venues)
+    del venues
+
+    start = time.perf_counter()
+    store.build_ann_index(args.lists)
+    print(f"IVF build: {store.ann.n_lists} lists in {time.perf_counter() - start:.1f}s\n")
+
+    rng = np.random.default_rng(args.seed + 1)
+    queries = []
+    for _ in range(args.queries):
+        query = centers[rng.integers(0, len(centers))] + NOISE * rng.standard_normal(args.dim).astype(np.float32)
+        lat = TOKYO[0] + rng.uniform(-0.1, 0.1)
+        lon = TOKYO[1] + rng.uniform(-0.1, 0.1)
+        queries.append((query, lat, lon))
+
+    start = time.perf_counter()
+    exact = [rank(store, q, lat, lon, args.k) for q, lat, lon in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    print(f"{'n_probe':>8} {'recall@' + str(args.k):>10} {'ms/query':>10} {'speedup':>8}")
+    print(f"{'exact':>8} {1.0:>10.3f} {exact_ms:>10.2f} {1.0:>8.1f}")
+    for n_probe in args.nprobe:
+        start = time.perf_counter()
+        approx = [rank(store, q, lat, lon, args.k, n_probe=n_probe) for q, lat, lon in queries]
+        ms = (time.perf_counter() - start) * 1000 / len(queries)
+        recall = np.mean([
+            len(set(a.tolist()) & set(e.tolist())) / max(len(e), 1)
+            for a, e in zip(approx, exact)
+        ])
+        print(f"{n_probe:>8} {recall:>10.3f} {ms:>10.2f} {exact_ms / ms:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
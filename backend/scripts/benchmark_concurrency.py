@@ -0,0 +1,115 @@
+"""Throughput of /api/recommendations under a slow upstream.
+
+Serves the real FastAPI app in-process (httpx ASGI transport) with a synthetic
+venue catalogue and a user lookup that sleeps --upstream-ms, standing in for
+a slow Firestore or OpenAI call. While --concurrency clients issue
+recommendation requests, a probe hits /health to show whether the event loop
+stays responsive.
+
+--inline runs the blocking call directly inside the async route, as the
+routes did before the shared executor, for comparison.
+
+Usage (from backend/):
+    python -m scripts.benchmark_concurrency --requests 200 --concurrency 50 --upstream-ms 200
+    python -m scripts.benchmark_concurrency --inline
+"""
+import argparse
+import asyncio
+import time
+import httpx
+import numpy as np
+from config import settings
+from app.main import app
+from app.routers import recommendations as recommendations_router
+from app.services import recommendation_engine
+from app.services.venue_source import InMemoryVenueSource
+from scripts.benchmark_ann import TOKYO, make_venues
+
+
+async def _inline(fn, *args, **kwargs):
+    return fn(*args, **kwargs)
+
+
+def _percentiles(samples):
+    if not samples:
+        return 0.0, 0.0
+    ms = np.array(samples) * 1000
+    return float(np.percentile(ms, 50)), float(np.percentile(ms, 99))
+
+
+async def run(args):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies = []
+
+        async def recommend(i):
+            async with semaphore:
+                start = time.perf_counter()
+                # Distinct users so the result cache and request coalescing don't kick in
+                response = await client.post("/api/recommendations", json={
+                    "user_id": f"bench_{i}",
+                    "location": {"latitude": TOKYO[0], "longitude": TOKYO[1]},
+                })
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        probes = []
+        done = asyncio.Event()
+
+        async def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/health")
+                probes.append(time.perf_counter() - start)
+                await asyncio.sleep(0.01)
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(recommend(i) for i in range(args.requests)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe_task
+
+    return elapsed, latencies, probes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--upstream-ms", type=float, default=200)
+    parser.add_argument("--workers", type=int, default=settings.BLOCKING_IO_WORKERS,
+                        help="BLOCKING_IO_WORKERS for this run")
+    parser.add_argument("--venues", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--inline", action="store_true", help="call blocking code on the event loop")
+    args = parser.parse_args()
+
+    settings.BLOCKING_IO_WORKERS = args.workers
+    venues, _ = make_venues(args.venues, args.dim, topics=50, seed=0)
+    recommendation_engine.set_venue_source(InMemoryVenueSource(venues))
+    recommendation_engine._get_venue_store()
+
+    rng = np.random.default_rng(1)
+
+    def slow_get_user(user_id):
+        time.sleep(args.upstream_ms / 1000)
+        return {"preferences": {"budget": 2}, "embedding": rng.standard_normal(args.dim).tolist()}
+
+    recommendation_engine.get_user = slow_get_user
+    if args.inline:
+        recommendations_router.run_blocking = _inline
+
+    elapsed, latencies, probes = asyncio.run(run(args))
+    mode = "inline (blocks event loop)" if args.inline else f"shared executor ({args.workers} threads)"
+    p50, p99 = _percentiles(latencies)
+    h50, h99 = _percentiles(probes)
+    print(f"{mode}: {args.requests} requests, concurrency {args.concurrency}, upstream {args.upstream_ms:.0f} ms")
+    print(f"  throughput        {args.requests / elapsed:8.1f} req/s")
+    print(f"  recommendations   p50 {p50:8.1f} ms   p99 {p99:8.1f} ms")
+    print(f"  /health probe     p50 {h50:8.1f} ms   p99 {h99:8.1f} ms   ({len(probes)} probes)")
+
+
+if __name__ == "__main__":
+    main()
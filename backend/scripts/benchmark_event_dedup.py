@@ -0,0 +1,95 @@
+"""Cost of analytics event deduplication at a sustained event rate.
+
+Replays --rate events/s of simulated time in 500-event batches, with a share
+of ids re-sent (client retries), through the in-process and shared SQLite
+deduplicators, and through the previous dict-scan implementation for a
+shorter stretch (its cost grows with the window contents). Reports the
+per-event cost, whether the deduplicator keeps up with the rate, and the
+ids held at the end.
+
+Usage (from backend/):
+    python -m scripts.benchmark_event_dedup --rate 10000 --seconds 120
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from app.services.event_dedup import EventDeduplicator, SQLiteEventDeduplicator
+
+BATCH = 500
+
+
+class LegacyDeduplicator:
+    """The previous analytics._is_duplicate: expire by scanning the whole dict on every event."""
+
+    def __init__(self, window_ms: int = 60000):
+        self.window_ms = window_ms
+        self.seen = {}
+
+    def check_batch(self, event_ids, now_ms):
+        flags = []
+        for event_id in event_ids:
+            expired = [eid for eid, ts in self.seen.items() if now_ms - ts > self.window_ms]
+            for eid in expired:
+                del self.seen[eid]
+            if event_id in self.seen:
+                flags.append(True)
+                continue
+            self.seen[event_id] = now_ms
+            flags.append(False)
+        return flags
+
+    def __len__(self):
+        return len(self.seen)
+
+
+def batches(rate: int, seconds: float, duplicate_share: float, seed: int):
+    rng = random.Random(seed)
+    recent = []
+    total = int(rate * seconds)
+    for start in range(0, total, BATCH):
+        now_ms = int(start * 1000 / rate)
+        ids = []
+        for i in range(start, min(start + BATCH, total)):
+            if recent and rng.random() < duplicate_share:
+                ids.append(rng.choice(recent))
+            else:
+                ids.append(f"evt_{i}")
+        recent = (recent + ids)[-2000:]
+        yield now_ms, ids
+
+
+def run(name, dedup, args, seconds):
+    events = duplicates = 0
+    start = time.perf_counter()
+    for now_ms, ids in batches(args.rate, seconds, args.duplicates, args.seed):
+        flags = dedup.check_batch(ids, now_ms)
+        events += len(ids)
+        duplicates += sum(flags)
+    elapsed = time.perf_counter() - start
+    per_event_us = elapsed / max(events, 1) * 1e6
+    capacity = events / elapsed if elapsed else float("inf")
+    held = len(dedup) if hasattr(dedup, "__len__") else "-"
+    print(f"{name:>10} {events:>9} {seconds:>6.0f}s {per_event_us:>9.2f} {capacity:>12,.0f} "
+          f"{'yes' if capacity >= args.rate else 'NO':>6} {duplicates:>7} {held:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=int, default=10000, help="events per second")
+    parser.add_argument("--seconds", type=float, default=120, help="simulated duration")
+    parser.add_argument("--duplicates", type=float, default=0.05, help="share of re-sent ids")
+    parser.add_argument("--legacy-seconds", type=float, default=2, help="simulated duration for the old dict scan")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'backend':>10} {'events':>9} {'sim':>7} {'us/event':>9} {'events/s':>12} {'keeps':>6} {'dupes':>7} {'ids held':>9}")
+    run("legacy", LegacyDeduplicator(), args, args.legacy_seconds)
+    run("memory", EventDeduplicator(), args, args.seconds)
+    with tempfile.TemporaryDirectory() as tmp:
+        run("sqlite", SQLiteEventDeduplicator(os.path.join(tmp, "dedup.sqlite")), args, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
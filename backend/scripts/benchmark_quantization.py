@@ -0,0 +1,106 @@
+"""Ranking agreement of reduced-precision scoring versus the float32 path.
+
+For each scoring configuration (precision, optional reduced dims and
+reduction method) and each re-rank shortlist size, reports scoring-matrix
+memory, overlap@k with the exact top-k, the share of queries whose top-k
+list is identical, and latency.
+
+Synthetic embeddings spread signal evenly over all dimensions, so truncation
+looks worse here than on real text-embedding-3 vectors. Use --firestore to
+measure on the live catalogue (queries are perturbed venue embeddings).
+
+Usage (from backend/):
+    python -m scripts.benchmark_quantization --venues 50000 --k 12
+    python -m scripts.benchmark_quantization --firestore --configs int8 float32:512 int8:256:pca
+"""
+import argparse
+import time
+import numpy as np
+from app.services.recommendation_engine import score_venues, top_k_indices
+from app.services.venue_store import VenueStore
+from scripts.benchmark_ann import NOISE, TOKYO, make_venues
+
+
+def parse_config(spec: str):
+    parts = spec.split(":")
+    precision = parts[0]
+    dims = int(parts[1]) if len(parts) > 1 else 0
+    reduction = parts[2] if len(parts) > 2 else "truncate"
+    return precision, dims, reduction
+
+
+def rank(store, query, lat, lon, k, rerank=None):
+    rows, _, _, scores = score_venues(store, query, lat, lon, 3, 30.0, rerank=rerank)
+    return rows[top_k_indices(np.round(scores, 4), k)]
+
+
+def load_store(args):
+    if args.firestore:
+        from app.services.venue_source import FirestoreVenueSource
+        from app.utils.firebase_client import initialize_firebase
+        initialize_firebase()
+        store = VenueStore(FirestoreVenueSource().load_all())
+        rng = np.random.default_rng(args.seed)
+        picks = rng.integers(0, len(store), args.queries)
+        queries = [
+            (store.embeddings[i] + 0.02 * rng.standard_normal(store.dim).astype(np.float32),
+             float(store.lat[i]), float(store.lon[i]))
+            for i in picks
+        ]
+        return store, queries
+
+    venues, centers = make_venues(args.venues, args.dim, args.topics, args.seed)
+    store = VenueStore(venues)
+    rng = np.random.default_rng(args.seed + 1)
+    queries = [
+        (centers[rng.integers(0, len(centers))] + NOISE * rng.standard_normal(args.dim).astype(np.float32),
+         TOKYO[0] + rng.uniform(-0.1, 0.1), TOKYO[1] + rng.uniform(-0.1, 0.1))
+        for _ in range(args.queries)
+    ]
+    return store, queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--venues", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=12)
+    parser.add_argument("--configs", nargs="+",
+                        default=["int8", "float32:512", "int8:512", "int8:256:pca"],
+                        help="precision[:dims[:truncate|pca]]")
+    parser.add_argument("--rerank", type=int, nargs="+", default=[12, 50, 200])
+    parser.add_argument("--firestore", action="store_true", help="benchmark the live venues collection")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    store, queries = load_store(args)
+    print(f"{len(store)} venues x {store.dim} dims, float32 matrix {store.embeddings.nbytes / 1e6:.1f} MB\n")
+
+    start = time.perf_counter()
+    exact = [rank(store, q, lat, lon, args.k) for q, lat, lon in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    header = f"{'config':>16} {'rerank':>7} {'MB':>8} {'overlap@' + str(args.k):>11} {'identical':>10} {'ms/query':>9}"
+    print(header)
+    print(f"{'float32':>16} {'-':>7} {store.embeddings.nbytes / 1e6:>8.1f} {1.0:>11.3f} {1.0:>10.3f} {exact_ms:>9.2f}")
+
+    for spec in args.configs:
+        precision, dims, reduction = parse_config(spec)
+        store.build_scoring_matrix(precision, dims, reduction)
+        for rerank in args.rerank:
+            start = time.perf_counter()
+            approx = [rank(store, q, lat, lon, args.k, rerank=rerank) for q, lat, lon in queries]
+            ms = (time.perf_counter() - start) * 1000 / len(queries)
+            overlap = np.mean([
+                len(set(a.tolist()) & set(e.tolist())) / max(len(e), 1)
+                for a, e in zip(approx, exact)
+            ])
+            identical = np.mean([np.array_equal(a, e) for a, e in zip(approx, exact)])
+            print(f"{spec:>16} {rerank:>7} {store.scoring.nbytes / 1e6:>8.1f} {overlap:>11.3f} {identical:>10.3f} {ms:>9.2f}")
+        store.scoring = None
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Build the preference embedding vocabulary used for local session embeddings.
+
+Embeds every dietary, vibe and mood option and the default text. Unless
+--tokens-only is given, it also embeds the full text of every combination the
+UI can produce (up to --max-dietary dietary values), so those are exact
+lookups rather than compositions. Point EMBEDDING_VOCABULARY_PATH at the
+output to enable it.
+
+Usage (from backend/):
+    python -m scripts.build_embedding_vocabulary --output app/data/embedding_vocabulary.npz
+"""
+import argparse
+import numpy as np
+from app.services.embedding_provider import get_embedding_provider
+from app.services.embedding_service import canonical_embedding_text, generate_embeddings
+from app.services.embedding_vocabulary import EmbeddingVocabulary, preference_token_sets, vocabulary_tokens
+
+# The embeddings endpoint accepts up to 2048 inputs per request
+_BATCH_SIZE = 512
+
+
+def embed_all(texts):
+    vectors = []
+    for start in range(0, len(texts), _BATCH_SIZE):
+        vectors.extend(generate_embeddings(texts[start:start + _BATCH_SIZE]))
+        print(f"  Embedded {len(vectors)}/{len(texts)}")
+    return np.array(vectors, dtype=np.float32)
+
+
+def phrase_texts(max_dietary: int):
+    return [canonical_embedding_text(" ".join(tokens)) for tokens in preference_token_sets(max_dietary)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="app/data/embedding_vocabulary.npz")
+    parser.add_argument("--max-dietary", type=int, default=2)
+    parser.add_argument("--tokens-only", action="store_true", help="skip precomputed combination phrases")
+    args = parser.parse_args()
+
+    texts = list(dict.fromkeys(vocabulary_tokens()))
+    if not args.tokens_only:
+        texts = list(dict.fromkeys(texts + phrase_texts(args.max_dietary)))
+
+    model = get_embedding_provider().model
+    print(f"Embedding {len(texts)} vocabulary entries with {model}...")
+    vocabulary = EmbeddingVocabulary(model, texts, embed_all(texts))
+    vocabulary.save(args.output)
+    print(f"Saved {len(vocabulary)} entries to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
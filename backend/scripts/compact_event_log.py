@@ -0,0 +1,46 @@
+"""Compact closed analytics event log segments into columnar training files.
+
+Reads the NDJSON segments written under ANALYTICS_EVENT_LOG_DIR and writes
+compressed .npz column files partitioned by UTC day and event_type. Segments
+are deleted once exported unless --keep-segments is given; re-running after
+a failure rewrites the same part files. Safe to run from cron while servers
+are appending: open segments are only read once their writer has exited.
+
+Usage (from backend/):
+    python -m scripts.compact_event_log --out ./exports/events
+    python -m scripts.compact_event_log --out ./exports/events --summary 2026-10-18
+"""
+import argparse
+from app.services.event_log import compact_segments, read_partitions
+from config import settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log-dir", default=settings.ANALYTICS_EVENT_LOG_DIR, help="segment directory")
+    parser.add_argument("--out", required=True, help="export directory")
+    parser.add_argument("--stale-minutes", type=float, default=1,
+                        help="minimum idle time before an unlocked open segment (crashed worker) is taken")
+    parser.add_argument("--keep-segments", action="store_true")
+    parser.add_argument("--summary", metavar="DAY", help="print event counts per event_type for DAY afterwards")
+    args = parser.parse_args()
+
+    if not args.log_dir:
+        parser.error("--log-dir is required when ANALYTICS_EVENT_LOG_DIR is not set")
+
+    compacted = compact_segments(args.log_dir, args.out, args.stale_minutes * 60, args.keep_segments)
+    for segment, count in compacted.items():
+        print(f"  {segment}: {count} events")
+    print(f"\nCompacted {len(compacted)} segments, {sum(compacted.values())} events")
+
+    if args.summary:
+        counts = {}
+        for columns in read_partitions(args.out, day=args.summary):
+            event_type = str(columns["event_type"][0])
+            counts[event_type] = counts.get(event_type, 0) + len(columns["event_type"])
+        for event_type, count in sorted(counts.items()):
+            print(f"{event_type:>28} {count:>9}")
+
+
+if __name__ == "__main__":
+    main()
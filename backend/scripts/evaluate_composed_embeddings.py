@@ -0,0 +1,76 @@
+"""Ranking agreement of locally composed preference embeddings versus the API.
+
+For every preference combination the UI can produce, compares the token
+composition from the vocabulary table (phrase entries ignored) with the real
+API embedding of the same text: cosine between the two vectors, and overlap
+of the top-k recommendations they produce over the live venue catalogue at a
+few locations. API embeddings go through the embedding cache, so repeat runs
+are cheap when EMBEDDING_CACHE_PATH is set.
+
+Usage (from backend/):
+    python -m scripts.evaluate_composed_embeddings --vocabulary app/data/embedding_vocabulary.npz --k 12
+"""
+import argparse
+import numpy as np
+from app.services.embedding_service import canonical_embedding_text, get_embedding
+from app.services.embedding_vocabulary import EmbeddingVocabulary, preference_token_sets
+from app.services.recommendation_engine import score_venues, top_k_indices
+from app.services.venue_source import FirestoreVenueSource
+from app.services.venue_store import VenueStore
+from app.utils.firebase_client import initialize_firebase
+
+# Shinjuku, Shibuya, Asakusa, Ginza
+LOCATIONS = [(35.6938, 139.7034), (35.6580, 139.7016), (35.7148, 139.7967), (35.6717, 139.7650)]
+
+
+def rank(store, embedding, lat, lon, k, budget, radius_km):
+    rows, _, _, scores = score_venues(store, embedding, lat, lon, budget, radius_km)
+    return rows[top_k_indices(np.round(scores, 4), k)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vocabulary", default="app/data/embedding_vocabulary.npz")
+    parser.add_argument("--max-dietary", type=int, default=2)
+    parser.add_argument("--k", type=int, default=12)
+    parser.add_argument("--budget", type=int, default=2)
+    parser.add_argument("--radius-km", type=float, default=30.0)
+    args = parser.parse_args()
+
+    vocabulary = EmbeddingVocabulary.load(args.vocabulary)
+    if vocabulary is None:
+        raise SystemExit(f"No vocabulary at {args.vocabulary}; run scripts.build_embedding_vocabulary first")
+
+    initialize_firebase()
+    store = VenueStore(FirestoreVenueSource().load_all())
+    print(f"{len(store)} venues, {len(vocabulary)} vocabulary entries\n")
+
+    cosines, overlaps, identical = [], [], []
+    worst = []
+    for tokens in preference_token_sets(args.max_dietary):
+        text = canonical_embedding_text(" ".join(tokens))
+        composed = np.asarray(vocabulary.compose(tokens), dtype=np.float32)
+        api = np.asarray(get_embedding(text), dtype=np.float32)
+        cosine = float(composed @ api / (np.linalg.norm(composed) * np.linalg.norm(api)))
+        cosines.append(cosine)
+
+        combo_overlap = []
+        for lat, lon in LOCATIONS:
+            exact = rank(store, api, lat, lon, args.k, args.budget, args.radius_km)
+            approx = rank(store, composed, lat, lon, args.k, args.budget, args.radius_km)
+            combo_overlap.append(len(set(exact.tolist()) & set(approx.tolist())) / max(len(exact), 1))
+            identical.append(np.array_equal(exact, approx))
+        overlaps.extend(combo_overlap)
+        worst.append((float(np.mean(combo_overlap)), cosine, text))
+
+    print(f"combinations           {len(cosines)}")
+    print(f"cosine(composed, api)  mean {np.mean(cosines):.4f}   min {np.min(cosines):.4f}")
+    print(f"overlap@{args.k:<14} mean {np.mean(overlaps):.3f}   min {np.min(overlaps):.3f}")
+    print(f"identical top-{args.k:<8} {np.mean(identical):.3f}")
+    print("\nLowest agreement:")
+    for overlap, cosine, text in sorted(worst)[:5]:
+        print(f"  overlap {overlap:.3f}  cosine {cosine:.4f}  {text}")
+
+
+if __name__ == "__main__":
+    main()
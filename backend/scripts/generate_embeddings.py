@@ -1,21 +1,30 @@
 import json
 import sys
 from pathlib import Path
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Optional, Tuple
 from openai import OpenAI
+from google.cloud import firestore
 from config import settings
+from app.services.embedding_provider import get_embedding_provider
 from app.utils.firebase_client import initialize_firebase, get_db
+from app.utils.embedding_codec import EMBEDDING_BLOB_FIELD, encode_embedding
+from app.utils.geohash import venue_geohash
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
+_client: Optional[OpenAI] = None
+
+
+def get_client() -> OpenAI:
+    # Created on first use so the module imports without an API key
+    global _client
+    if _client is None:
+        _client = OpenAI(api_key=settings.OPENAI_API_KEY)
+    return _client
 
 
 def generate_embedding(venue_text: str) -> List[float]:
+    # Same provider as user/session embeddings, so venues share their vector space
     try:
-        response = client.embeddings.create(
-            model="text-embedding-3-small",
-            input=venue_text
-        )
-        return response.data[0].embedding
+        return get_embedding_provider().embed([venue_text])[0]
     except Exception as e:
         raise Exception(f"Embedding API error: {e}")
 
@@ -100,7 +109,7 @@ You are a Tokyo travel expert specializing in solo travelers. Analyze the venue
 """.strip()
     
     try:
-        response = client.chat.completions.create(
+        response = get_client().chat.completions.create(
             model="gpt-4o",
             response_format={"type": "json_object"},
             messages=[
@@ -143,6 +152,12 @@ def upload_to_firebase(venue: Dict[str, Any]) -> None:
     if not doc_id:
         raise ValueError(f"Venue missing place_id: {venue.get('name')}")
     
+    geohash = venue_geohash(venue)
+    if geohash:
+        venue["geohash"] = geohash
+    # Lets running API instances pick the change up with an incremental refresh
+    venue["updated_at"] = firestore.SERVER_TIMESTAMP
+    
     db.collection("venues").document(doc_id).set(venue)
 
 
@@ -211,7 +226,7 @@ def main():
             print(f"  Tags: {', '.join(insights['tags'][:3])}")
             print(f"  Tip: {insights['pro_tip'][:45]}...")
             
-            venue["embedding"] = embedding
+            venue[EMBEDDING_BLOB_FIELD] = encode_embedding(embedding)
             venue["solo_score"] = insights["solo_score"]
             venue["solo_reason"] = insights["solo_reason"]
             venue["pro_tip"] = insights["pro_tip"]
@@ -243,7 +258,7 @@ def main():
     if success == len(venues):
         print("\nAll venues processed successfully!")
         print("Data is now in Firebase with:")
-        print("  - Embeddings (for semantic search)")
+        print("  - Embeddings (packed float32, for semantic search)")
         print("  - Solo scores (for quality signals)")
         print("  - Pro tips (actionable advice)")
         print("  - Tags (UI display)")
@@ -0,0 +1,70 @@
+import sys
+from google.cloud import firestore
+from google.cloud.firestore_v1 import FieldPath
+from app.utils.embedding_codec import EMBEDDING_BLOB_FIELD, encode_embedding
+from app.utils.firebase_client import initialize_firebase, get_db
+
+
+def migrate_embeddings(page_size: int = 200, keep_list: bool = False):
+    """Rewrite list-of-doubles embeddings as packed float32 blobs.
+
+    Pages are kept small because each legacy document carries ~1536 values.
+    Bumping updated_at lets running servers pick the change up via delta refresh.
+    """
+    initialize_firebase()
+    db = get_db()
+
+    print("Scanning venues for list-encoded embeddings...")
+    query = db.collection("venues") \
+        .select(["embedding", EMBEDDING_BLOB_FIELD]) \
+        .order_by(FieldPath.document_id()) \
+        .limit(page_size)
+
+    migrated = 0
+    skipped = 0
+    last_doc = None
+
+    while True:
+        page = query.start_after(last_doc) if last_doc else query
+        docs = list(page.stream())
+
+        batch = db.batch()
+        pending = 0
+        for doc in docs:
+            data = doc.to_dict()
+            embedding = data.get("embedding")
+            if data.get(EMBEDDING_BLOB_FIELD) and (keep_list or embedding is None):
+                continue
+            if not embedding and not data.get(EMBEDDING_BLOB_FIELD):
+                skipped += 1
+                continue
+
+            update = {"updated_at": firestore.SERVER_TIMESTAMP}
+            if not data.get(EMBEDDING_BLOB_FIELD):
+                update[EMBEDDING_BLOB_FIELD] = encode_embedding(embedding)
+            if not keep_list:
+                update["embedding"] = firestore.DELETE_FIELD
+            batch.update(doc.reference, update)
+            pending += 1
+
+        if pending:
+            batch.commit()
+            migrated += pending
+            print(f"  Migrated {migrated} venues...")
+
+        if len(docs) < page_size:
+            break
+        last_doc = docs[-1]
+
+    print(f"\nTotal migrated: {migrated} venues")
+    if skipped:
+        print(f"Skipped {skipped} venues without embeddings")
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("MIGRATE VENUE EMBEDDINGS TO PACKED FLOAT32")
+    print("=" * 60)
+    print()
+    # --keep-list leaves the legacy field in place so older servers keep working
+    migrate_embeddings(keep_list="--keep-list" in sys.argv[1:])
@@ -0,0 +1,41 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+# Tests run from backend/ and import the app the same way uvicorn does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TOKYO = (35.68, 139.76)
+
+
+@pytest.fixture
+def make_venues():
+    """Factory for scorable venue documents with embeddings clustered around topics.
+
+    make_venues(n, dim, topics, seed) returns (venues, topic centers). Venues
+    are spread over about 30 km around Tokyo.
+    """
+    def make(n: int, dim: int = 16, topics: int = 4, seed: int = 0, spread_degrees: float = 0.15):
+        rng = np.random.default_rng(seed)
+        centers = rng.standard_normal((topics, dim)).astype(np.float32)
+        labels = rng.integers(0, topics, n)
+        embeddings = centers[labels] + 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+        lats = TOKYO[0] + rng.uniform(-spread_degrees, spread_degrees, n)
+        lons = TOKYO[1] + rng.uniform(-spread_degrees, spread_degrees, n)
+        ratings = rng.choice([3.5, 4.0, 4.2, 4.5, 4.8], n)
+        prices = rng.integers(0, 5, n)
+        venues = [
+            {
+                "place_id": f"venue_{i}",
+                "location": {"latitude": float(lats[i]), "longitude": float(lons[i])},
+                "rating": float(ratings[i]),
+                "price_level": int(prices[i]),
+                "activity": ("eat", "drink", "explore")[i % 3],
+                "embedding": embeddings[i].tolist(),
+            }
+            for i in range(n)
+        ]
+        return venues, centers
+
+    return make
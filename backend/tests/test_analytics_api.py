@@ -0,0 +1,32 @@
+import json
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.routers import analytics
+
+
+def _client():
+    app = FastAPI()
+    app.include_router(analytics.router)
+    return TestClient(app)
+
+
+def test_event_request_body_is_documented():
+    spec = _client().get("/openapi.json").json()
+    body = spec["paths"]["/api/analytics/event"]["post"]["requestBody"]
+    schema = body["content"]["application/json"]["schema"]
+
+    assert body["required"] is True
+    assert schema["required"] == ["events"]
+    assert schema["properties"]["events"]["items"]["required"] == ["event_type"]
+    assert "$ref" not in json.dumps(schema) and "$defs" not in schema
+
+
+def test_invalid_event_batch_is_400():
+    client = _client()
+
+    missing_type = client.post("/api/analytics/event", json={"events": [{"session_id": "s"}]})
+    assert missing_type.status_code == 400
+    assert missing_type.json()["detail"][0]["loc"] == ["body", "events", 0, "event_type"]
+
+    assert client.post("/api/analytics/event", content=b"{not json").status_code == 400
+    assert client.post("/api/analytics/event", json={"events": []}).status_code == 400
@@ -0,0 +1,29 @@
+import sqlite3
+from app.services.embedding_cache import EmbeddingCache
+
+
+def test_corrupt_row_is_a_miss_until_rewritten(tmp_path, capsys):
+    path = str(tmp_path / "embeddings.db")
+    EmbeddingCache(path).put("model", "ramen", [1.0, 0.0])
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE embeddings SET vector = ?", (b"\x00\x01",))
+
+    cache = EmbeddingCache(path)
+    assert cache.get("model", "ramen") is None
+    assert "Cache read failed" in capsys.readouterr().out
+
+    cache.put("model", "ramen", [1.0, 0.0])
+    assert EmbeddingCache(path).get("model", "ramen") == [1.0, 0.0]
+
+
+def test_unusable_path_falls_back_to_memory(tmp_path, capsys):
+    blocker = tmp_path / "not_a_dir"
+    blocker.write_text("")
+    cache = EmbeddingCache(str(blocker / "embeddings.db"))
+
+    assert cache.get("model", "ramen") is None
+    cache.put("model", "ramen", [1.0, 0.0])
+
+    out = capsys.readouterr().out
+    assert "Cache read failed" in out and "Cache write failed" in out
+    assert cache.get("model", "ramen") == [1.0, 0.0]
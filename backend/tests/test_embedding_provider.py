@@ -0,0 +1,17 @@
+import pytest
+from app.services.embedding_provider import EmbeddingProvider, HashingEmbeddingProvider
+
+
+def test_backend_without_embed_fails_at_construction():
+    class Incomplete(EmbeddingProvider):
+        model = "incomplete"
+        dim = 8
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_hashing_provider_is_an_embedding_provider():
+    provider = HashingEmbeddingProvider(dim=16)
+    assert isinstance(provider, EmbeddingProvider)
+    assert [len(vector) for vector in provider.embed(["a", "b c"])] == [16, 16]
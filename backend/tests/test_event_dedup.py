@@ -0,0 +1,51 @@
+from app.services.event_dedup import EventDeduplicator, SQLiteEventDeduplicator
+
+
+def test_ids_expire_with_their_bucket():
+    dedup = EventDeduplicator(window_ms=60000, bucket_ms=5000)
+    assert dedup.check_batch(["a"], 1000) == [False]
+    assert dedup.check_batch(["b"], 30000) == [False]
+
+    # Forgotten between window and window + bucket after the bucket started
+    assert dedup.check_batch(["a"], 64999) == [True]
+    assert dedup.check_batch(["a"], 65000) == [False]
+    assert dedup.check_batch(["b"], 65000) == [True]
+    assert len(dedup) == 2
+
+
+def test_buckets_rotate_and_only_live_ones_are_kept():
+    dedup = EventDeduplicator(window_ms=3000, bucket_ms=1000)
+    for second in range(10):
+        dedup.check_batch([f"id{second}"], second * 1000)
+
+    assert [bucket for bucket, _ in dedup._buckets] == [6, 7, 8, 9]
+    assert dedup.check_batch(["id5", "id6"], 9000) == [False, True]
+
+
+def test_max_ids_drops_oldest_buckets_first():
+    dedup = EventDeduplicator(window_ms=60000, max_ids=10, bucket_ms=1000)
+    dedup.check_batch([f"old{i}" for i in range(6)], 0)
+    dedup.check_batch([f"new{i}" for i in range(6)], 1000)
+
+    assert len(dedup) == 6
+    assert dedup.check_batch(["new0", "old0"], 1500) == [True, False]
+
+
+def test_duplicates_within_one_batch():
+    dedup = EventDeduplicator()
+    assert dedup.check_batch(["a", "b", "a", "a"], 0) == [False, False, True, True]
+
+
+def test_sqlite_window_is_shared_across_instances(tmp_path):
+    path = str(tmp_path / "dedup" / "events.sqlite")
+    first = SQLiteEventDeduplicator(path, window_ms=60000)
+    assert first.check_batch(["a", "b", "a"], 0) == [False, False, True]
+
+    # Another worker, or the same one after a restart
+    second = SQLiteEventDeduplicator(path, window_ms=60000)
+    assert second.check_batch(["a", "c"], 30000) == [True, False]
+    assert first.check_batch(["c"], 31000) == [True]
+
+    # Expired sightings count as new and are recorded again
+    assert second.check_batch(["a"], 60001) == [False]
+    assert first.check_batch(["a"], 60002) == [True]
@@ -0,0 +1,92 @@
+import glob
+import os
+import time
+from app.services import event_log
+from app.services.event_log import EventLog, compact_segments, read_partitions
+
+
+def _events(start, count):
+    return [
+        {"event_type": "venue_view", "session_id": "s1", "timestamp": 1760000000000 + i, "seq": i}
+        for i in range(start, start + count)
+    ]
+
+
+def _exported_seqs(export_dir):
+    return sorted(int(seq) for part in read_partitions(export_dir) for seq in part["seq"])
+
+
+def test_compaction_leaves_live_writer_segment_alone(tmp_path):
+    log_dir, export_dir = str(tmp_path / "log"), str(tmp_path / "export")
+    log = EventLog(log_dir, fsync_interval_ms=10000)
+    try:
+        log.append(_events(0, 5))
+        # Even with no staleness guard, the writer's lock keeps its segment out
+        assert compact_segments(log_dir, export_dir, stale_seconds=0) == {}
+        assert len(glob.glob(os.path.join(log_dir, "*.ndjson.open"))) == 1
+
+        log.append(_events(5, 5))
+    finally:
+        log.close()
+
+    compacted = compact_segments(log_dir, export_dir, stale_seconds=0)
+    assert sum(compacted.values()) == 10
+    assert _exported_seqs(export_dir) == list(range(10))
+    assert os.listdir(log_dir) == []
+
+
+def test_abandoned_open_segment_is_compacted(tmp_path):
+    log_dir, export_dir = str(tmp_path / "log"), str(tmp_path / "export")
+    os.makedirs(log_dir)
+    # A crashed writer leaves an unlocked .open segment behind
+    with open(os.path.join(log_dir, "segment-20261018T000000000000-1.ndjson.open"), "wb") as f:
+        f.write(b'{"event_type":"venue_view","timestamp":1760000000000,"seq":1}\n{"torn')
+
+    assert sum(compact_segments(log_dir, export_dir, stale_seconds=0).values()) == 1
+    assert _exported_seqs(export_dir) == [1]
+
+
+def test_segments_roll_by_age(tmp_path):
+    log_dir = str(tmp_path / "log")
+    log = EventLog(log_dir, fsync_interval_ms=10000, segment_max_age_ms=0)
+    try:
+        log.append(_events(0, 1))
+        log.append(_events(1, 1))
+        assert len(glob.glob(os.path.join(log_dir, "*.ndjson"))) == 2
+    finally:
+        log.close()
+
+
+def test_failed_rename_starts_a_fresh_segment(tmp_path):
+    log_dir = str(tmp_path / "log")
+    log = EventLog(log_dir, fsync_interval_ms=10000, segment_max_bytes=1)
+    try:
+        log.segment_max_bytes = 1 << 20
+        log.append(_events(0, 1))
+        (open_path,) = glob.glob(os.path.join(log_dir, "*.ndjson.open"))
+        os.remove(open_path)
+
+        log.segment_max_bytes = 1
+        log.append(_events(1, 1))  # rolls the vanished segment, then writes a new one
+        log.append(_events(2, 1))
+        assert len(glob.glob(os.path.join(log_dir, "*.ndjson"))) == 2
+    finally:
+        log.close()
+
+
+def test_without_flock_only_stale_open_segments_are_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr(event_log, "fcntl", None)
+    log_dir, export_dir = str(tmp_path / "log"), str(tmp_path / "export")
+    log = EventLog(log_dir, fsync_interval_ms=10000)
+    try:
+        log.append(_events(0, 3))
+        log.sync()
+        assert compact_segments(log_dir, export_dir, stale_seconds=60) == {}
+
+        # Once untouched for longer than stale_seconds it is taken as abandoned
+        (path,) = glob.glob(os.path.join(log_dir, "*.ndjson.open"))
+        os.utime(path, (time.time() - 120, time.time() - 120))
+        assert sum(compact_segments(log_dir, export_dir, stale_seconds=60).values()) == 3
+        assert _exported_seqs(export_dir) == [0, 1, 2]
+    finally:
+        log.close()
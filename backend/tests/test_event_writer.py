@@ -0,0 +1,68 @@
+from google.api_core import exceptions as api_exceptions
+from app.services import event_writer
+from app.services.event_writer import EventWriteBehind, firestore_encoding_error
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self.db = db
+        self.payloads = []
+
+    def set(self, ref, payload):
+        self.payloads.append(payload)
+
+    def commit(self):
+        self.db.commits += 1
+        if self.db.transient_failures:
+            self.db.transient_failures -= 1
+            raise api_exceptions.ServiceUnavailable("try again")
+        if any(payload.get("bad") for payload in self.payloads):
+            raise api_exceptions.InvalidArgument("bad document")
+        self.db.written.extend(self.payloads)
+
+
+class FakeDB:
+    def __init__(self, transient_failures=0):
+        self.written = []
+        self.commits = 0
+        self.transient_failures = transient_failures
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def collection(self, name):
+        return self
+
+    def document(self):
+        return object()
+
+
+def test_rejected_event_does_not_drop_its_batch():
+    db = FakeDB()
+    writer = EventWriteBehind(db_factory=lambda: db)
+    batch = [{"seq": i} for i in range(100)]
+    batch[37]["bad"] = True
+
+    writer._commit(batch)
+
+    assert writer.dropped == 1
+    assert writer.committed == 99
+    assert sorted(payload["seq"] for payload in db.written) == [i for i in range(100) if i != 37]
+
+
+def test_transient_errors_are_retried_whole(monkeypatch):
+    monkeypatch.setattr(event_writer, "_RETRY_BACKOFF_SECONDS", 0)
+    db = FakeDB(transient_failures=2)
+    writer = EventWriteBehind(db_factory=lambda: db)
+
+    writer._commit([{"seq": i} for i in range(10)])
+
+    assert (writer.committed, writer.dropped, db.commits) == (10, 0, 3)
+
+
+def test_firestore_encoding_error():
+    assert firestore_encoding_error({"event_type": "x", "nested": {"list": [1, {"a": [2]}]}}) is None
+    assert "64 bits" in firestore_encoding_error({"event_type": "x", "big": 2 ** 63})
+    assert "arrays" in firestore_encoding_error({"event_type": "x", "grid": [[1, 2]]})
+    assert "field name" in firestore_encoding_error({"event_type": "x", "__name__": 1})
+    assert "1 MiB" in firestore_encoding_error({"event_type": "x", "blob": "a" * (1024 * 1024)})
@@ -0,0 +1,66 @@
+from app.services import freeze_engine
+from app.services.freeze_engine import FreezeEngine
+
+GENTLE_MS = 90000
+
+
+def _cards(session_id, ts, count=3):
+    return [
+        {"event_type": "venue_view", "session_id": session_id, "timestamp": ts + i, "venue_id": f"v{i}"}
+        for i in range(count)
+    ]
+
+
+def test_late_batches_keep_sessions_in_last_seen_order():
+    engine = FreezeEngine(session_idle_ms=60000)
+    engine.process(_cards("a", 0), wall_ms=100000)
+    # Read its wall clock before "a", took the lock after
+    engine.process(_cards("b", 0), wall_ms=90000)
+
+    assert [state.seen_wall_ms for state in engine._sessions.values()] == [100000, 100000]
+    engine.sweep(159999)
+    assert len(engine) == 2
+    engine.sweep(160000)
+    assert len(engine) == 0
+
+
+def test_sweep_in_chunks_checks_every_idle_session_once(monkeypatch):
+    monkeypatch.setattr(freeze_engine, "_SWEEP_CHUNK", 3)
+    engine = FreezeEngine(session_idle_ms=30 * 60 * 1000)
+    for i in range(10):
+        engine.process(_cards(f"idle{i}", 0), wall_ms=0)
+    engine.process(_cards("fresh", 60000), wall_ms=60000)
+    engine.process(_cards("few-cards", 0, count=1), wall_ms=0)
+
+    detections = engine.sweep(GENTLE_MS)
+
+    assert sorted(d["session_id"] for d in detections) == [f"idle{i}" for i in range(10)]
+    assert {d["level"] for d in detections} == {"GENTLE"}
+    assert engine.sweep(GENTLE_MS + 1000) == []
+
+
+def test_sweep_evicts_idle_sessions_in_chunks(monkeypatch):
+    monkeypatch.setattr(freeze_engine, "_SWEEP_CHUNK", 4)
+    engine = FreezeEngine(session_idle_ms=1000)
+    for i in range(10):
+        engine.process(_cards(f"s{i}", 0), wall_ms=i)
+    engine.process(_cards("recent", 0), wall_ms=5000)
+
+    engine.sweep(1009)
+
+    assert list(engine._sessions) == ["recent"]
+    assert engine.sessions_evicted == 10
+
+
+def test_scroll_indecision_from_scroll_events():
+    engine = FreezeEngine()
+    events = [
+        {"event_type": "scroll_event", "session_id": "s", "timestamp": 1000 * i,
+         "scroll_direction": "down" if i % 2 else "up", "scroll_distance_px": 200}
+        for i in range(6)
+    ]
+
+    detections = engine.process(events, wall_ms=6000)
+
+    assert [(d["rule"], d["level"]) for d in detections] == [("scroll_indecision", "GENTLE")]
+    assert detections[0]["context"]["scroll_cycles"] == 2
@@ -0,0 +1,49 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app.services.embedding_provider import OpenAIEmbeddingProvider
+from app.utils.micro_batcher import MicroBatcher
+
+
+def test_hung_batch_does_not_block_other_batches():
+    release = threading.Event()
+
+    def batch_fn(items):
+        if "hang" in items:
+            release.wait(10)
+        return [item.upper() for item in items]
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=1, max_wait_ms=0, max_in_flight=2)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        hung = pool.submit(batcher.submit, "hang")
+        try:
+            assert pool.submit(batcher.submit, "ok").result(timeout=2) == "OK"
+            assert not hung.done()
+        finally:
+            release.set()
+        assert hung.result(timeout=2) == "HANG"
+
+
+def test_batch_error_fails_every_caller_in_the_batch():
+    started = threading.Barrier(3)
+
+    def batch_fn(items):
+        raise TimeoutError("Request timed out.")
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=200)
+
+    def call(item):
+        started.wait()
+        return batcher.submit(item)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(call, item) for item in ("a", "b", "c")]
+        for future in futures:
+            with pytest.raises(TimeoutError, match="timed out"):
+                future.result(timeout=2)
+
+
+def test_openai_client_has_timeout():
+    pytest.importorskip("openai")
+    provider = OpenAIEmbeddingProvider("sk-test", timeout=3.0)
+    assert provider.client.timeout == 3.0
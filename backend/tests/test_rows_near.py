@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from app.services.venue_store import GRID_CELL_DEGREES, VenueStore, haversine_km
+
+
+def _store(points):
+    return VenueStore([
+        {
+            "place_id": f"venue_{i}",
+            "location": {"latitude": float(lat), "longitude": float(lon)},
+            "embedding": [1.0, 0.0, 0.0, 0.0],
+        }
+        for i, (lat, lon) in enumerate(points)
+    ])
+
+
+def _assert_matches_brute_force(store, lat, lon, radius_km):
+    rows = store.rows_near(lat, lon, radius_km)
+    assert np.all(np.diff(rows) > 0), "rows must be unique and in row order"
+    within = store.distances_from(lat, lon, rows) <= radius_km
+    brute = np.flatnonzero(haversine_km(lat, lon, store.lat_rad, store.lon_rad, store.cos_lat) <= radius_km)
+    assert rows[within].tolist() == brute.tolist()
+    return brute
+
+
+def test_venues_on_cell_boundaries():
+    eps = 1e-9
+    points = [
+        (35.0 + i * GRID_CELL_DEGREES + d, 139.0 + j * GRID_CELL_DEGREES + e)
+        for i in range(5) for j in range(5) for d in (-eps, 0.0, eps) for e in (-eps, 0.0, eps)
+    ]
+    store = _store(points)
+    for lat, lon in [(35.2, 139.2), (35.2 - eps, 139.2 + eps), (35.15, 139.35)]:
+        for radius in (0.5, 5.0, 11.1, 25.0):
+            _assert_matches_brute_force(store, lat, lon, radius)
+
+
+@pytest.mark.parametrize("radius_km", [1.0, 12.0, 40.0, 150.0])
+def test_radius_spanning_several_cells(radius_km):
+    rng = np.random.default_rng(0)
+    points = np.column_stack([rng.uniform(34.0, 36.5, 3000), rng.uniform(138.5, 141.0, 3000)])
+    store = _store(points)
+    for lat, lon in rng.uniform([34.5, 139.0], [36.0, 140.5], (10, 2)):
+        _assert_matches_brute_force(store, lat, lon, radius_km)
+
+
+def test_southern_and_western_hemispheres():
+    rng = np.random.default_rng(1)
+    points = np.column_stack([rng.uniform(-34.2, -33.6, 2000), rng.uniform(-58.8, -58.2, 2000)])
+    store = _store(points)
+    _assert_matches_brute_force(store, -33.9, -58.5, 15.0)
+
+
+def test_antimeridian_falls_back_to_all_rows():
+    points = [(-17.7, 179.95), (-17.7, -179.95), (-17.7, 179.5), (-17.7, -179.0), (-16.0, 178.0)]
+    store = _store(points)
+
+    assert len(store.rows_near(-17.7, -179.98, 20.0)) == len(store)
+    brute = _assert_matches_brute_force(store, -17.7, -179.98, 20.0)
+    assert brute.tolist() == [0, 1]
+
+
+def test_near_pole_falls_back_to_all_rows():
+    points = [(89.95, lon) for lon in (-170.0, -60.0, 10.0, 120.0)] + [(89.0, 1.0)]
+    store = _store(points)
+
+    assert len(store.rows_near(89.97, 45.0, 10.0)) == len(store)
+    brute = _assert_matches_brute_force(store, 89.97, 45.0, 10.0)
+    assert brute.tolist() == [0, 1, 2, 3]
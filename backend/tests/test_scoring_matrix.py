@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from app.services import scoring_matrix
+from app.services.recommendation_engine import score_venues
+from app.services.scoring_matrix import ScoringMatrix
+from app.services.venue_store import VenueStore
+
+
+def _embeddings(n=1000, dim=64, seed=0):
+    rng = np.random.default_rng(seed)
+    embeddings = rng.standard_normal((n, dim)).astype(np.float32)
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("precision", ["float32", "int8"])
+def test_chunked_similarities_match_unchunked(monkeypatch, precision):
+    monkeypatch.setattr(scoring_matrix, "_SCORE_CHUNK_ROWS", 7)
+    embeddings = _embeddings()
+    matrix = ScoringMatrix(embeddings, precision=precision, dims=32)
+    rows = np.sort(np.random.default_rng(1).choice(len(embeddings), 300, replace=False))
+    query = embeddings[5]
+
+    expected = matrix.matrix[rows].astype(np.float32) @ matrix._reduce(query)
+    if matrix.scale is not None:
+        expected *= matrix.scale[rows]
+
+    np.testing.assert_allclose(matrix.similarities(query, rows), expected, rtol=1e-5, atol=1e-6)
+    assert len(matrix.similarities(query, rows[:0])) == 0
+
+
+def test_float16_is_not_offered():
+    with pytest.raises(ValueError):
+        ScoringMatrix(_embeddings(), precision="float16")
+
+
+def test_spilled_embeddings_rank_the_same(make_venues):
+    venues, centers = make_venues(2000, 64, 20)
+    store = VenueStore(venues)
+    query = centers[3]
+    lat, lon = venues[0]["location"]["latitude"], venues[0]["location"]["longitude"]
+    before = score_venues(store, query, lat, lon, 3, 30.0)
+
+    store.build_scoring_matrix("int8", 32)
+    store.spill_embeddings()
+    after = score_venues(store, query, lat, lon, 3, 30.0)
+
+    assert isinstance(store.embeddings, np.memmap)
+    for expected, actual in zip(before, after):
+        np.testing.assert_allclose(actual, expected)
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import pytest
+from app.utils.blocking import run_blocking
+from app.utils.single_flight import SingleFlight
+
+CALLERS = 5
+
+
+async def _call_together(flight, fn, release):
+    # Every caller enters do() before the leader is allowed to finish
+    arrived = threading.Barrier(CALLERS)
+
+    def call():
+        arrived.wait(2)
+        return flight.do("key", fn)
+
+    tasks = [asyncio.ensure_future(run_blocking(call)) for _ in range(CALLERS)]
+    await asyncio.sleep(0.2)
+    release.set()
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def test_concurrent_callers_share_one_computation():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(2)
+        return {"venues": ["a", "b"]}
+
+    results = asyncio.run(_call_together(flight, compute, release))
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert flight._calls == {}
+
+
+def test_error_reaches_every_waiter_then_clears():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(2)
+        raise TimeoutError("Request timed out.")
+
+    results = asyncio.run(_call_together(flight, compute, release))
+
+    assert len(calls) == 1
+    assert len(results) == CALLERS
+    assert all(isinstance(result, TimeoutError) for result in results)
+    assert flight._calls == {}
+
+    # The failure is not cached: the next call runs again
+    assert flight.do("key", lambda: "fresh") == "fresh"
+
+
+def test_different_keys_do_not_wait_for_each_other():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    async def main():
+        slow = asyncio.ensure_future(run_blocking(flight.do, "slow", release.wait, 2))
+        try:
+            fast = await asyncio.wait_for(run_blocking(flight.do, "fast", lambda: "done"), 1)
+            assert not slow.done()
+        finally:
+            release.set()
+        assert await slow is True
+        return fast
+
+    assert asyncio.run(main()) == "done"
+
+
+def test_leader_error_is_raised_to_the_leader():
+    flight = SingleFlight()
+
+    def compute():
+        raise ValueError("bad")
+
+    with pytest.raises(ValueError, match="bad"):
+        flight.do("key", compute)
+    assert flight._calls == {}
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from app.services.recommendation_engine import top_k_indices
+
+
+def _stable_top_k(scores, k):
+    return sorted(range(len(scores)), key=lambda i: -scores[i])[:max(k, 0)]
+
+
+def test_ties_keep_input_order():
+    scores = np.array([0.5, 0.9, 0.5, 0.9, 0.1, 0.5])
+    assert top_k_indices(scores, 3).tolist() == [1, 3, 0]
+    # Ties straddling the cut are broken by position, not by partition order
+    assert top_k_indices(scores, 4).tolist() == [1, 3, 0, 2]
+
+
+@pytest.mark.parametrize("k", [0, -1])
+def test_non_positive_k_is_empty(k):
+    result = top_k_indices(np.array([0.3, 0.2]), k)
+    assert result.tolist() == [] and result.dtype == np.intp
+
+
+def test_empty_scores():
+    assert top_k_indices(np.array([]), 5).tolist() == []
+
+
+@pytest.mark.parametrize("k", [4, 5, 100])
+def test_k_at_least_n_returns_everything_sorted(k):
+    scores = np.array([0.2, 0.8, 0.2, 0.5])
+    assert top_k_indices(scores, k).tolist() == [1, 3, 0, 2]
+
+
+def test_matches_stable_full_sort():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        # Few distinct values, so most cuts fall inside a run of ties
+        scores = np.round(rng.random(rng.integers(1, 40)), 1)
+        k = int(rng.integers(0, len(scores) + 2))
+        assert top_k_indices(scores, k).tolist() == _stable_top_k(scores.tolist(), k)
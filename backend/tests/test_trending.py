@@ -0,0 +1,100 @@
+from datetime import datetime
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.routers import recommendations
+from app.services import recommendation_engine
+from app.utils.embedding_codec import EMBEDDING_BLOB_FIELD
+
+
+class FakeDoc:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class FakeQuery:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def where(self, *args, **kwargs):
+        return self
+
+    def order_by(self, *args, **kwargs):
+        return self
+
+    def limit(self, *args):
+        return self
+
+    def stream(self):
+        return iter(self.docs)
+
+
+class FakeDB:
+    def __init__(self, venues, cached=None):
+        self.venues = venues
+        self.cached = cached
+        self.written = None
+
+    def collection(self, name):
+        if name == "venues":
+            return FakeQuery(self.venues)
+        return self
+
+    def document(self, doc_id):
+        return self
+
+    def get(self):
+        return FakeDoc("trending", self.cached)
+
+    def set(self, data):
+        self.written = data
+
+
+def _venue(doc_id):
+    return FakeDoc(doc_id, {
+        "name": f"Venue {doc_id}",
+        "rating": 4.8,
+        "reviews_count": 250,
+        "embedding": [0.1, 0.2],
+        EMBEDDING_BLOB_FIELD: b"\xff\xfe\x00\x80",
+    })
+
+
+def _client(monkeypatch, db):
+    monkeypatch.setattr(recommendation_engine, "get_db", lambda: db)
+    monkeypatch.setattr(recommendation_engine, "_trending_cache", {"data": None, "fetched_at": None})
+    app = FastAPI()
+    app.include_router(recommendations.router)
+    return TestClient(app)
+
+
+def test_trending_strips_embedding_blobs(monkeypatch):
+    db = FakeDB([_venue("a"), _venue("b")])
+
+    response = _client(monkeypatch, db).get("/api/recommendations/trending")
+
+    assert response.status_code == 200
+    venues = response.json()["venues"]
+    assert [venue["venue_id"] for venue in venues] == ["a", "b"]
+    for venue in venues + db.written["venues"]:
+        assert "embedding" not in venue
+        assert EMBEDDING_BLOB_FIELD not in venue
+
+
+def test_trending_strips_blobs_from_old_firestore_cache(monkeypatch):
+    cached = {
+        "venues": [{**_venue("a").to_dict(), "venue_id": "a"}],
+        "refreshed_at": datetime.utcnow().isoformat(),
+    }
+    db = FakeDB([], cached=cached)
+
+    response = _client(monkeypatch, db).get("/api/recommendations/trending")
+
+    assert response.status_code == 200
+    assert response.json()["venues"] == [
+        {"name": "Venue a", "rating": 4.8, "reviews_count": 250, "venue_id": "a"}
+    ]
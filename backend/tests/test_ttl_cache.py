@@ -0,0 +1,50 @@
+from app.utils.ttl_cache import TTLCache
+
+
+def test_discard_only_holds_back_fills_of_that_key():
+    cache = TTLCache(max_entries=10, ttl_seconds=None)
+    generation = cache.invalidations
+
+    cache.discard("alice")
+    cache.set("alice", "stale", generation=generation)
+    cache.set("bob", "fresh", generation=generation)
+
+    assert cache.get("alice") is None
+    assert cache.get("bob") == "fresh"
+    cache.set("alice", "fresh", generation=cache.invalidations)
+    assert cache.get("alice") == "fresh"
+
+
+def test_clear_holds_back_every_fill():
+    cache = TTLCache(max_entries=10, ttl_seconds=None)
+    generation = cache.invalidations
+    cache.clear()
+    cache.set("a", 1, generation=generation)
+    assert cache.get("a") is None
+
+
+def test_discard_group_only_holds_back_fills_of_that_group():
+    cache = TTLCache(max_entries=10, ttl_seconds=None, group=lambda key: key[0])
+    cache.set(("alice", 1), "old")
+    cache.set(("bob", 1), "kept")
+    generation = cache.invalidations
+
+    assert cache.discard_group("alice") == 1
+    cache.set(("alice", 2), "stale", generation=generation)
+    cache.set(("bob", 2), "fresh", generation=generation)
+
+    assert cache.get(("alice", 1)) is None
+    assert cache.get(("alice", 2)) is None
+    assert cache.get(("bob", 1)) == "kept"
+    assert cache.get(("bob", 2)) == "fresh"
+
+
+def test_forgotten_discards_stay_conservative():
+    cache = TTLCache(max_entries=2, ttl_seconds=None)
+    generation = cache.invalidations
+    for key in ("a", "b", "c"):
+        cache.discard(key)
+
+    # "a" no longer has its own record, so fills from before the discard are refused
+    cache.set("a", "stale", generation=generation)
+    assert cache.get("a") is None
@@ -0,0 +1,41 @@
+from app.services import recommendation_engine
+from app.services.venue_source import InMemoryVenueSource
+
+
+class ScanningSource(InMemoryVenueSource):
+    """Applies writes partway through load_all, as concurrent writers would during a paged scan."""
+
+    def __init__(self, venues, during_scan):
+        super().__init__(venues)
+        self.during_scan = during_scan
+
+    def load_all(self):
+        venues = super().load_all()
+        half = len(venues) // 2
+        # The first half was read before the writes, the second half after
+        scanned, during_scan, self.during_scan = venues[:half], self.during_scan, None
+        if during_scan:
+            during_scan(self)
+        return scanned + super().load_all()[half:]
+
+
+def test_write_during_full_load_is_picked_up_by_next_delta(monkeypatch, make_venues):
+    venues, _ = make_venues(20, 8, 2)
+    first, last = venues[0]["place_id"], venues[-1]["place_id"]
+
+    def writes(source):
+        source.upsert({**venues[0], "name": "renamed"})   # already scanned
+        source.upsert({**venues[-1], "name": "touched"})  # not yet scanned, newer stamp
+
+    source = ScanningSource(venues, writes)
+    monkeypatch.setattr(recommendation_engine, "_venue_source", source)
+    monkeypatch.setattr(recommendation_engine, "_venue_store_cache", dict(recommendation_engine._EMPTY_VENUE_CACHE))
+
+    recommendation_engine._refresh_from_source()
+    store = recommendation_engine._venue_store_cache["store"]
+    assert store.venues[store.ids.index(first)].get("name") is None
+    assert store.venues[store.ids.index(last)]["name"] == "touched"
+
+    recommendation_engine._refresh_from_source()
+    store = recommendation_engine._venue_store_cache["store"]
+    assert store.venues[store.ids.index(first)]["name"] == "renamed"
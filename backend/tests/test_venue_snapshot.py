@@ -0,0 +1,65 @@
+import os
+from datetime import datetime, timezone
+import numpy as np
+from app.services.recommendation_engine import score_venues
+from app.services.venue_snapshot import load_snapshot, read_manifest, write_snapshot
+from app.services.venue_store import VenueStore
+
+FETCHED_AT = datetime(2026, 10, 18, 12, 0)
+SYNCED_TO = datetime(2026, 10, 18, 11, 59, tzinfo=timezone.utc)
+
+
+def _assert_same_scores(original, mapped, query, lat, lon, **kwargs):
+    for expected, actual in zip(
+        score_venues(original, query, lat, lon, 3, 20.0, **kwargs),
+        score_venues(mapped, query, lat, lon, 3, 20.0, **kwargs),
+    ):
+        np.testing.assert_array_equal(actual, expected)
+
+
+def test_snapshot_round_trip_scores_the_same(tmp_path, make_venues):
+    venues, centers = make_venues(600, 16, 4)
+    store = VenueStore(venues)
+    store.build_ann_index(8)
+    directory = str(tmp_path)
+
+    version = write_snapshot(store, directory, FETCHED_AT, SYNCED_TO)
+
+    assert open(os.path.join(directory, "CURRENT")).read() == version
+    manifest = read_manifest(directory)
+    assert manifest["version"] == version
+    assert manifest["count"] == len(store)
+    assert manifest["fetched_at"] == FETCHED_AT and manifest["synced_to"] == SYNCED_TO
+
+    mapped, _ = load_snapshot(directory)
+    assert isinstance(mapped.embeddings, np.memmap)
+    assert mapped.ids == store.ids
+    assert mapped.venues[5] == store.venues[5]
+    np.testing.assert_array_equal(mapped.ann.centroids, store.ann.centroids)
+    np.testing.assert_array_equal(mapped.ann.assignments, store.ann.assignments)
+
+    lat, lon = venues[0]["location"]["latitude"], venues[0]["location"]["longitude"]
+    _assert_same_scores(store, mapped, centers[1], lat, lon)
+    _assert_same_scores(store, mapped, centers[2], lat, lon, activity="eat", n_probe=2)
+
+    # The scoring matrix is rebuilt per deployment rather than saved
+    store.build_scoring_matrix("int8", 8)
+    mapped.build_scoring_matrix("int8", 8)
+    _assert_same_scores(store, mapped, centers[3], lat, lon, rerank=20)
+
+
+def test_old_snapshots_are_pruned(tmp_path, make_venues):
+    store = VenueStore(make_venues(50)[0])
+    directory = str(tmp_path)
+
+    versions = [write_snapshot(store, directory, FETCHED_AT, None) for _ in range(4)]
+
+    assert sorted(name for name in os.listdir(directory) if not name.startswith(".")) == \
+        sorted(["CURRENT", *versions[-2:]])
+    assert read_manifest(directory)["version"] == versions[-1]
+    assert read_manifest(directory)["synced_to"] is None
+
+
+def test_no_snapshot_yet(tmp_path):
+    assert read_manifest(str(tmp_path)) is None
+    assert load_snapshot(str(tmp_path)) is None
@@ -0,0 +1,48 @@
+import numpy as np
+from app.services.venue_store import VenueStore
+
+
+def _venue(i, dim, lat=35.68):
+    return {
+        "place_id": f"venue_{i}",
+        "location": {"latitude": lat, "longitude": 139.76},
+        "embedding": [1.0] + [0.0] * (dim - 1),
+    }
+
+
+def test_store_uses_most_common_embedding_dim(capsys):
+    # The odd one out comes first, which used to decide the dimension
+    venues = [_venue(0, 3)] + [_venue(i, 8) for i in range(1, 6)] + [_venue(6, 8, lat=None)]
+
+    store = VenueStore(venues)
+
+    assert store.dim == 8
+    assert store.ids == [f"venue_{i}" for i in range(1, 6)]
+    out = capsys.readouterr().out
+    assert "Skipped 1 venues whose embedding is not 8-dimensional: venue_0" in out
+    assert "Skipped 1 venues without an embedding or coordinates" in out
+
+
+def test_activity_postings_match_column_scan(make_venues):
+    venues, _ = make_venues(60, 8, 2)
+    venues[0]["activity"] = None
+    store = VenueStore(venues)
+    rows = np.arange(0, len(store), 3)
+
+    def scanned(store, rows, activity):
+        return rows[store.activity_column[rows] == store.activity_codes[activity]].tolist()
+
+    for activity in ("eat", "drink", "explore"):
+        assert store.rows_for_activity(rows, activity).tolist() == scanned(store, rows, activity)
+    assert store.rows_for_activity(rows, "any") is rows
+    assert len(store.rows_for_activity(rows, "shop")) == 0
+
+    # Upserts rebuild the postings: venue_3 leaves "eat", a new venue joins "shop"
+    store = store.apply_changes([
+        {**venues[3], "activity": "drink"},
+        {**venues[4], "place_id": "new", "activity": "shop"},
+    ])
+    rows = np.arange(len(store))
+    for activity in ("eat", "drink", "explore", "shop"):
+        assert store.rows_for_activity(rows, activity).tolist() == scanned(store, rows, activity)
+    assert [store.ids[row] for row in store.rows_for_activity(rows, "shop")] == ["new"]